@@ -0,0 +1,229 @@
+import asyncio
+import datetime
+
+import httpx
+
+from active_boost.blueprints.fitbit.models import DailyActivity
+from active_boost.blueprints.security.models import Account
+from active_boost.common.models import BearerAuth
+from active_boost.common.util import get_http_client, activity_cache, config
+
+# Maximum amount of days Fitbit allows a single date range request to span per resource.
+date_range_limits = {
+    "activities": 1095,
+    "activities/heart": 365,
+    "sleep": 100,
+    "spo2": 30,
+}
+intraday_range_limits = {"activities/heart": 1}
+fitbit_semaphore = asyncio.Semaphore(config.FITBIT_CONCURRENCY)
+
+
+def raise_for_transient_status(response: httpx.Response) -> None:
+    """
+    Raises HTTPStatusError for responses Fitbit may succeed on later, rate limited and server error responses, so that
+    they are retried rather than treated as error payloads.
+    """
+    if response.status_code == 429 or response.status_code >= 500:
+        response.raise_for_status()
+
+
+def plan_date_ranges(
+    start: datetime.date, end: datetime.date, max_days: int
+) -> list[tuple[datetime.date, datetime.date]]:
+    """
+    Splits a date range into consecutive windows spanning no more than the maximum amount of days.
+
+    Args:
+        start (date): First day of the range.
+        end (date): Last day of the range.
+        max_days (int): Maximum amount of days in a window.
+
+    Returns:
+        windows
+    """
+    windows = []
+    while start <= end:
+        window_end = min(start + datetime.timedelta(days=max_days - 1), end)
+        windows.append((start, window_end))
+        start = window_end + datetime.timedelta(days=1)
+    return windows
+
+
+def merge_series(payloads: list) -> dict | list:
+    """
+    Merges responses of consecutive windows into one response, series are concatenated in window order.
+
+    Args:
+        payloads (list): Responses of each window in order.
+
+    Returns:
+        series
+    """
+    merged = [] if isinstance(payloads[0], list) else {}
+    for payload in payloads:
+        if isinstance(payload, dict) and "errors" in payload:
+            return payload
+        if isinstance(merged, list):
+            merged.extend(payload)
+        else:
+            for key, value in payload.items():
+                if isinstance(value, list):
+                    merged.setdefault(key, []).extend(value)
+                else:
+                    merged[key] = value
+    return merged
+
+
+async def get_date_range_windows(
+    account: Account,
+    token_info: dict,
+    resource: str,
+    start: str,
+    end: str,
+    detail_level: str = None,
+) -> list[tuple]:
+    """
+    Retrieves a Fitbit resource over a date range of any length. Ranges longer than Fitbit allows for the resource are
+    split into windows retrieved concurrently. Intraday ranges are limited as each day is a separate request.
+
+    Args:
+        account (Account): Account the resource is being retrieved for.
+        token_info (dict): OAuth token information of the account.
+        resource (str): Path of the resource being retrieved (e.g., "activities/steps", "sleep", "spo2").
+        start (str): First day of the range, formatted as yyyy-MM-dd.
+        end (str): Last day of the range, formatted as yyyy-MM-dd.
+        detail_level (str): Intraday detail level being retrieved (e.g., "1sec", "1min"), omit for daily summaries.
+
+    Raises:
+        ValueError
+
+    Returns:
+        windows
+    """
+    try:
+        windows = plan_date_ranges(
+            datetime.date.fromisoformat(start),
+            datetime.date.fromisoformat(end),
+            (
+                intraday_range_limits[resource]
+                if detail_level
+                else date_range_limits.get(resource)
+                or date_range_limits[resource.split("/")[0]]
+            ),
+        )
+    except (TypeError, ValueError):
+        windows = [(start, end)]  # Relative dates such as "today" are left to Fitbit.
+    if detail_level and len(windows) > config.INTRADAY_MAX_DAYS:
+        raise ValueError(
+            f"Intraday ranges cannot span more than {config.INTRADAY_MAX_DAYS} days."
+        )
+
+    async def get_window(window_start, window_end):
+        async with fitbit_semaphore:
+            data = await get_http_client().get(
+                f"https://api.fitbit.com/1/user/{account.user_id}/{resource}/date/{window_start}/{window_end}"
+                f"{f"/{detail_level}" if detail_level else ""}.json",
+                auth=BearerAuth(token_info["access_token"]),
+            )
+            raise_for_transient_status(data)
+            return window_start, data.json()
+
+    return await asyncio.gather(*[get_window(*window) for window in windows])
+
+
+async def get_date_range(
+    account: Account, token_info: dict, resource: str, start: str, end: str
+) -> dict | list:
+    """
+    Retrieves a Fitbit resource over a date range of any length as one series.
+
+    Args:
+        account (Account): Account the resource is being retrieved for.
+        token_info (dict): OAuth token information of the account.
+        resource (str): Path of the resource being retrieved (e.g., "activities/steps", "sleep", "spo2").
+        start (str): First day of the range, formatted as yyyy-MM-dd.
+        end (str): Last day of the range, formatted as yyyy-MM-dd.
+
+    Returns:
+        series
+    """
+    windows = await get_date_range_windows(account, token_info, resource, start, end)
+    return merge_series([payload for _, payload in windows] if windows else [{}])
+
+
+async def iterate_activity_list(token_info: dict, url: str):
+    """
+    Retrieves pages of an activity list by following Fitbit pagination cursors, the next page is retrieved while the
+    current page is being consumed so that only two pages are held at once.
+
+    Args:
+        token_info (dict): OAuth token information of the account the activity list is being retrieved for.
+        url (str): Url of the first page.
+
+    Returns:
+        pages
+    """
+
+    async def get_page(page_url):
+        async with fitbit_semaphore:
+            data = await get_http_client().get(
+                page_url, auth=BearerAuth(token_info["access_token"])
+            )
+            raise_for_transient_status(data)
+            return data.json()
+
+    next_page = asyncio.ensure_future(get_page(url))
+    try:
+        while next_page:
+            page = await next_page
+            next_url = page.get("pagination", {}).get("next")
+            next_page = asyncio.ensure_future(get_page(next_url)) if next_url else None
+            yield page
+    finally:
+        if next_page:
+            next_page.cancel()
+
+
+def get_activity_total(series: dict, resource: str) -> int:
+    """Sums the rounded daily values of an activity time series."""
+    return sum(
+        round(float(activity["value"])) for activity in series[f"activities-{resource}"]
+    )
+
+
+def get_activity_series_key(
+    account: Account, resource: str, start: str, end: str
+) -> tuple:
+    """Retrieves the key an activity time series is cached with."""
+    return account.user_id, resource, start, end
+
+
+async def get_activity_series(
+    account: Account, token_info: dict, resource: str, start: str, end: str
+) -> dict:
+    """
+    Retrieves activity time series from Fitbit and stores its daily totals locally. Series are cached until they
+    expire or Fitbit notifies that the account's activity has changed.
+
+    Args:
+        account (Account): Account the series is being retrieved for.
+        token_info (dict): OAuth token information of the account.
+        resource (str): Activity resource being retrieved (e.g., "distance", "steps", "calories").
+        start (str): First day of the series, formatted as yyyy-MM-dd.
+        end (str): Last day of the series, formatted as yyyy-MM-dd.
+
+    Returns:
+        series
+    """
+    key = get_activity_series_key(account, resource, start, end)
+    series = activity_cache.get(key)
+    if series:
+        return series
+    series = await get_date_range(
+        account, token_info, f"activities/{resource}", start, end
+    )
+    if f"activities-{resource}" in series:
+        await DailyActivity.record(account, resource, series[f"activities-{resource}"])
+        activity_cache.set(key, series)
+    return series
@@ -0,0 +1,90 @@
+import datetime
+
+from tortoise import fields
+
+from active_boost.blueprints.security.models import Account
+from active_boost.common.models import BaseModel
+
+
+class DailyActivity(BaseModel):
+    """
+    Daily activity total of an account synced from Fitbit, held locally so that group wide statistics can be computed
+    without an upstream request per member.
+
+    Attributes:
+        account (ForeignKeyRelation["Account"]): The account the activity was logged by.
+        resource (str): Activity resource the value measures (e.g., "distance", "steps", "calories").
+        date (date): Day the activity was logged.
+        value (float): Activity total for the day.
+    """
+
+    account: fields.ForeignKeyRelation["Account"] = fields.ForeignKeyField(
+        "models.Account", related_name="daily_activities"
+    )
+    resource: str = fields.CharField(max_length=255)
+    date: datetime.date = fields.DateField()
+    value: float = fields.FloatField()
+
+    @classmethod
+    async def record(cls, account: Account, resource: str, series: list[dict]) -> None:
+        """
+        Stores Fitbit activity time series, replacing values previously stored for the same days.
+
+        Args:
+            account (Account): Account the series belongs to.
+            resource (str): Activity resource of the series.
+            series (list[dict]): Fitbit time series entries containing a "dateTime" and a "value".
+        """
+        if series:
+            await cls.bulk_create(
+                [
+                    cls(
+                        account=account,
+                        resource=resource,
+                        date=datetime.date.fromisoformat(entry["dateTime"]),
+                        value=float(entry["value"]),
+                    )
+                    for entry in series
+                ],
+                on_conflict=["account_id", "resource", "date"],
+                update_fields=["value"],
+            )
+
+    @property
+    def json(self) -> dict:
+        return {
+            "date_created": str(self.date_created),
+            "date_updated": str(self.date_updated),
+            "id": self.id,
+            "resource": self.resource,
+            "date": str(self.date),
+            "value": self.value,
+        }
+
+    class Meta:
+        unique_together = ("account", "resource", "date")
+
+
+class FitbitCredential(BaseModel):
+    """
+    OAuth token information of an account subscribed to Fitbit change notifications, allowing its activity to be
+    synced when Fitbit reports changes rather than when the account makes a request.
+
+    Attributes:
+        account (OneToOneRelation["Account"]): The account the token information belongs to.
+        token_info (dict): Most recent OAuth token information of the account.
+    """
+
+    account: fields.OneToOneRelation["Account"] = fields.OneToOneField(
+        "models.Account", related_name="fitbit_credential"
+    )
+    token_info: dict = fields.JSONField()
+
+    @property
+    def json(self) -> dict:
+        return {
+            "date_created": str(self.date_created),
+            "date_updated": str(self.date_updated),
+            "id": self.id,
+            "subscription_id": str(self.account_id),
+        }
@@ -0,0 +1,140 @@
+import datetime
+import re
+
+import numpy as np
+
+resolution_units = {"min": 60, "h": 3600, "d": 86400}
+aggregations = ["mean", "max", "min", "sum", "count"]
+
+
+def parse_resolution(resolution: str) -> int:
+    """
+    Converts a resolution such as "15min", "1h" or "1d" into seconds.
+
+    Raises:
+        ValueError
+
+    Returns:
+        seconds
+    """
+    match = re.fullmatch(r"(\d+)(min|h|d)", resolution or "")
+    if not match or int(match.group(1)) < 1:
+        raise ValueError("Resolution must be a positive amount of min, h or d.")
+    return int(match.group(1)) * resolution_units[match.group(2)]
+
+
+def get_intraday_arrays(windows: list[tuple]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Flattens daily Fitbit heart rate intraday responses into timestamp and value arrays. Fitbit reports intraday times
+    in the user's local time, timestamps are therefore seconds since epoch of that local time as if it were UTC.
+
+    Args:
+        windows (list[tuple]): Start date and response of each retrieved day.
+
+    Returns:
+        timestamps, values
+    """
+    timestamps, values = [], []
+    for _, payload in windows:
+        if not payload.get("activities-heart"):
+            continue
+        day = datetime.datetime.fromisoformat(
+            payload["activities-heart"][0]["dateTime"]
+        ).replace(tzinfo=datetime.UTC)
+        dataset = payload["activities-heart-intraday"]["dataset"]
+        if not dataset:
+            continue
+        seconds = np.array(
+            [entry["time"].split(":") for entry in dataset], dtype=np.int64
+        ) @ np.array([3600, 60, 1])
+        timestamps.append(int(day.timestamp()) + seconds)
+        values.append(
+            np.fromiter((entry["value"] for entry in dataset), float, len(dataset))
+        )
+    if not timestamps:
+        return np.empty(0, np.int64), np.empty(0)
+    return np.concatenate(timestamps), np.concatenate(values)
+
+
+def resample(
+    timestamps: np.ndarray, values: np.ndarray, resolution: int, aggregation: str
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Aggregates values into buckets of equal duration, buckets without values are omitted.
+
+    Args:
+        timestamps (np.ndarray): Seconds since epoch of each value.
+        values (np.ndarray): Values being aggregated.
+        resolution (int): Seconds spanned by each bucket.
+        aggregation (str): Either "mean", "max", "min", "sum" or "count".
+
+    Returns:
+        bucket timestamps, bucket values
+    """
+    if aggregation not in aggregations:
+        raise ValueError(f"Aggregation must be {", ".join(aggregations)}.")
+    buckets, inverse = np.unique(timestamps // resolution, return_inverse=True)
+    if aggregation == "mean":
+        aggregated = np.bincount(inverse, values) / np.bincount(inverse)
+    elif aggregation == "sum":
+        aggregated = np.bincount(inverse, values, len(buckets))
+    elif aggregation == "count":
+        aggregated = np.bincount(inverse, minlength=len(buckets)).astype(float)
+    else:
+        aggregated = np.full(len(buckets), -np.inf if aggregation == "max" else np.inf)
+        (np.maximum if aggregation == "max" else np.minimum).at(
+            aggregated, inverse, values
+        )
+    return buckets * resolution, aggregated
+
+
+def get_columnar_intraday(
+    windows: list[tuple], resolution: int, aggregation: str
+) -> dict:
+    """
+    Converts heart rate intraday responses into resampled timestamp and value columns.
+
+    Args:
+        windows (list[tuple]): Start date and response of each retrieved day.
+        resolution (int): Seconds spanned by each bucket.
+        aggregation (str): Either "mean", "max", "min", "sum" or "count".
+
+    Returns:
+        columns
+    """
+    timestamps, values = resample(
+        *get_intraday_arrays(windows), resolution, aggregation
+    )
+    return {
+        "resolution": resolution,
+        "aggregation": aggregation,
+        "timezone": "local",
+        "timestamps": timestamps.tolist(),
+        "values": np.round(values, 2).tolist(),
+    }
+
+
+def get_columnar_zones(series: dict) -> dict:
+    """
+    Converts a daily heart rate series into date, resting heart rate and minutes per heart rate zone columns.
+
+    Args:
+        series (dict): Fitbit heart rate time series response.
+
+    Returns:
+        columns
+    """
+    days = series.get("activities-heart", [])
+    zones = {}
+    for index, day in enumerate(days):
+        for zone in day["value"].get("heartRateZones", []):
+            zones.setdefault(zone["name"], np.zeros(len(days)))[index] = zone.get(
+                "minutes", 0
+            )
+    return {
+        "resolution": resolution_units["d"],
+        "aggregation": "zones",
+        "timestamps": [day["dateTime"] for day in days],
+        "resting_heart_rate": [day["value"].get("restingHeartRate") for day in days],
+        "zones": {name: minutes.tolist() for name, minutes in zones.items()},
+    }
@@ -0,0 +1,104 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import time
+import traceback
+
+from sanic import Sanic
+
+from active_boost.blueprints.fitbit.client import get_activity_series
+from active_boost.blueprints.fitbit.models import FitbitCredential
+from active_boost.blueprints.security.view import get_o_auth
+from active_boost.common.util import (
+    config,
+    activity_cache,
+    analytics_cache,
+    activity_resource_options,
+)
+
+# https://dev.fitbit.com/build/reference/web-api/developer-guide/using-subscriptions/
+
+notification_queue = asyncio.Queue()
+pending_notifications = set()
+
+
+def is_signature_valid(body: bytes, signature: str) -> bool:
+    """Determines if a notification was signed by Fitbit using the application's client secret."""
+    expected = base64.b64encode(
+        hmac.new(f"{config.FITBIT_SECRET}&".encode(), body, hashlib.sha1).digest()
+    ).decode()
+    return hmac.compare_digest(expected, signature or "")
+
+
+def enqueue_notifications(notifications: list[dict]) -> None:
+    """Queues changed (user, collection, date) tuples for syncing, tuples already awaiting sync are ignored."""
+    for notification in notifications:
+        change = (
+            notification["ownerId"],
+            notification["collectionType"],
+            notification["date"],
+        )
+        if change not in pending_notifications:
+            pending_notifications.add(change)
+            notification_queue.put_nowait(change)
+
+
+async def get_token_info(credential: FitbitCredential) -> dict:
+    """Retrieves stored OAuth token information, refreshing and storing it if it has expired."""
+    if time.time() > credential.token_info["expires_at"]:
+        credential.token_info = await get_o_auth().refresh_token(
+            credential.token_info["refresh_token"]
+        )
+        await credential.save(update_fields=["token_info"])
+    return credential.token_info
+
+
+async def sync_change(user_id: str, collection: str, date: str) -> None:
+    """
+    Drops cached Fitbit data of the changed user and retrieves the changed day so that locally stored activity is
+    current.
+
+    Args:
+        user_id (str): Fitbit id of the user whose data changed.
+        collection (str): Fitbit collection that changed (e.g., "activities", "sleep", "body").
+        date (str): Day the change occurred, formatted as yyyy-MM-dd.
+    """
+    activity_cache.discard_where(lambda key: key[0] == user_id)
+    credential = (
+        await FitbitCredential.filter(account__user_id=user_id, deleted=False)
+        .prefetch_related("account")
+        .first()
+    )
+    if not credential:
+        return
+    group_ids = set(
+        await credential.account.memberships.filter(deleted=False).values_list(
+            "id", flat=True
+        )
+    )
+    analytics_cache.discard_where(lambda key: key[0] in group_ids)
+    if collection == "activities":
+        token_info = await get_token_info(credential)
+        for resource in activity_resource_options:
+            await get_activity_series(
+                credential.account, token_info, resource, date, date
+            )
+
+
+async def subscription_worker() -> None:
+    """Syncs queued changes reported by Fitbit one at a time."""
+    while True:
+        change = await notification_queue.get()
+        pending_notifications.discard(change)
+        try:
+            await sync_change(*change)
+        except Exception:
+            traceback.print_exc()
+
+
+def initialize_subscriptions(app: Sanic) -> None:
+    @app.after_server_start
+    async def subscription_worker_initializer(app, loop):
+        """Begins syncing changes reported by Fitbit."""
+        app.add_task(subscription_worker(), name="fitbit_subscription_worker")
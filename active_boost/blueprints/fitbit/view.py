@@ -1,12 +1,34 @@
 import datetime
 import traceback
-from json import JSONDecodeError
+from json import JSONDecodeError, dumps
 
-from sanic import Blueprint
+import httpx
+from sanic import Blueprint, empty
+from sanic.utils import str_to_bool
 
+from active_boost.blueprints.fitbit.client import (
+    get_activity_series,
+    get_activity_series_key,
+    get_date_range,
+    get_date_range_windows,
+    iterate_activity_list,
+)
+from active_boost.blueprints.fitbit.models import FitbitCredential
+from active_boost.blueprints.fitbit.subscription import (
+    is_signature_valid,
+    enqueue_notifications,
+)
+from active_boost.common.compression import open_stream
 from active_boost.common.exceptions import AuthorizationError
 from active_boost.common.models import BearerAuth
-from active_boost.common.util import json, http_client, activity_resource_options
+from active_boost.common.util import (
+    json,
+    get_http_client,
+    activity_resource_options,
+    activity_cache,
+    config,
+    project_fields,
+)
 
 fitbit_bp = Blueprint("fitbit", url_prefix="fitbit")
 
@@ -14,130 +36,307 @@ fitbit_bp = Blueprint("fitbit", url_prefix="fitbit")
 # https://dev.fitbit.com/build/reference/web-api/
 
 
+async def stream_activity_list(request, url: str):
+    """
+    Streams every activity of a paginated activity list, as newline delimited json or, if the format argument is json,
+    as a single chunked json response. If a page fails after the stream has begun, the stream ends with an error record
+    or, for json, an error key.
+    """
+    pages = iterate_activity_list(request.ctx.token_info, url)
+    page = await anext(pages)
+    if "activities" not in page:
+        await pages.aclose()
+        return json("Activity log retrieved.", page)
+    as_json = request.args.get("format") == "json"
+    response = await open_stream(
+        request, "application/json" if as_json else "application/x-ndjson"
+    )
+    if as_json:
+        await response.send(
+            '{"message": "Activity log retrieved.", "code": 200, "data": ['
+        )
+    separator = ""
+    error = None
+    while page:
+        if "errors" in page:
+            error = page
+            break
+        if as_json:
+            for activity in project_fields(page.get("activities", [])):
+                await response.send(separator + dumps(activity))
+                separator = ","
+        else:
+            await response.send(
+                "".join(
+                    dumps(activity) + "\n"
+                    for activity in project_fields(page.get("activities", []))
+                )
+            )
+        await response.flush()
+        try:
+            page = await anext(pages, None)
+        except httpx.HTTPError as e:
+            error = {"errors": [{"errorType": "upstream", "message": str(e)}]}
+            break
+    await pages.aclose()
+    # A failed page truncates the stream, which is signalled by a trailing error rather than ending as if complete.
+    if as_json:
+        await response.send("]" + (f', "error": {dumps(error)}' if error else "") + "}")
+    elif error:
+        await response.send(dumps({"error": error}) + "\n")
+    await response.eof()
+
+
 @fitbit_bp.get("activity/list/weekly")
 async def on_get_activity_weekly(request):
-    data = await http_client.get(
+    if str_to_bool(request.args.get("all", "false")):
+        return await stream_activity_list(
+            request,
+            f"https://api.fitbit.com/1/user/{request.ctx.account.user_id}/activities/list.json?"
+            f"afterDate={(datetime.datetime.now(datetime.UTC) - datetime.timedelta(weeks=1)).strftime('%Y-%m-%d')}"
+            "&sort=asc&limit=100&offset=0",
+        )
+    data = await get_http_client().get(
         f"https://api.fitbit.com/1/user/{request.ctx.account.user_id}/activities/list.json?"
         f"afterDate={(datetime.datetime.now(datetime.UTC) - datetime.timedelta(weeks=1)).strftime('%Y-%m-%d')}&sort=desc&limit=20&offset=0",
         auth=BearerAuth(request.ctx.token_info["access_token"]),
     )
-    return json("Activity log retrieved.", data.json())
+    return json("Activity log retrieved.", data.json(), project=["activities"])
 
 
 @fitbit_bp.get("activity/list")
 async def on_get_activity_list(request):
-    data = await http_client.get(
+    if str_to_bool(request.args.get("all", "false")):
+        return await stream_activity_list(
+            request,
+            f"https://api.fitbit.com/1/user/{request.ctx.account.user_id}/activities/list.json?"
+            f"{f"afterDate={request.args.get("after")}&sort=asc" if request.args.get("after") else f"beforeDate={request.args.get("before")}&sort=desc"}"
+            "&limit=100&offset=0",
+        )
+    data = await get_http_client().get(
         f"https://api.fitbit.com/1/user/{request.ctx.account.user_id}/activities/list.json?"
         f"{f"afterDate={request.args.get("after")}" if request.args.get("after") else f"beforeDate={request.args.get("before")}"}"
         "&sort=desc&limit=100&offset=0",
         auth=BearerAuth(request.ctx.token_info["access_token"]),
     )
-    return json("Activity log retrieved.", data.json())
+    return json("Activity log retrieved.", data.json(), project=["activities"])
 
 
 @fitbit_bp.get("activity/weekly")
 async def on_get_activity_log_weekly(request):
     if request.args.get("type") not in activity_resource_options:
         raise ValueError(f"Log type must be {", ".join(activity_resource_options)}.")
-    data = await http_client.get(
-        f"https://api.fitbit.com/1/user/{request.ctx.account.user_id}/activities/{request.args.get("type")}/date/"
-        f"{(datetime.datetime.now(datetime.UTC) - datetime.timedelta(weeks=1)).strftime('%Y-%m-%d')}/"
-        f"{datetime.datetime.now(datetime.UTC).strftime('%Y-%m-%d')}.json",
-        auth=BearerAuth(request.ctx.token_info["access_token"]),
+    start = (
+        datetime.datetime.now(datetime.UTC) - datetime.timedelta(weeks=1)
+    ).strftime("%Y-%m-%d")
+    end = datetime.datetime.now(datetime.UTC).strftime("%Y-%m-%d")
+    series = await get_activity_series(
+        request.ctx.account,
+        request.ctx.token_info,
+        request.args.get("type"),
+        start,
+        end,
     )
-    return json("Activity log retrieved.", data.json())
+    request.ctx.cache_encodings = activity_cache.get_encodings(
+        get_activity_series_key(
+            request.ctx.account, request.args.get("type"), start, end
+        )
+    )
+    return json("Activity log retrieved.", series, project=True)
 
 
 @fitbit_bp.get("activity")
 async def on_get_activity_log(request):
     if request.args.get("type") not in activity_resource_options:
         raise ValueError(f"Log type must be {", ".join(activity_resource_options)}.")
-    data = await http_client.get(
-        f"https://api.fitbit.com/1/user/{request.ctx.account.user_id}/activities/{request.args.get("type")}/date/"
-        f"{request.args.get("start")}/{request.args.get("end")}.json",
-        auth=BearerAuth(request.ctx.token_info["access_token"]),
+    series = await get_activity_series(
+        request.ctx.account,
+        request.ctx.token_info,
+        request.args.get("type"),
+        request.args.get("start"),
+        request.args.get("end"),
+    )
+    request.ctx.cache_encodings = activity_cache.get_encodings(
+        get_activity_series_key(
+            request.ctx.account,
+            request.args.get("type"),
+            request.args.get("start"),
+            request.args.get("end"),
+        )
     )
-    return json("Activity log retrieved.", data.json())
+    return json("Activity log retrieved.", series, project=True)
 
 
 @fitbit_bp.get("active-minutes")
 async def on_get_active_minutes(request):
-    data = await http_client.get(
+    data = await get_http_client().get(
         f"https://api.fitbit.com/1/user/{request.ctx.account.user_id}/activities/active-zone-minutes/date/"
         f"{request.args.get("start")}/{request.args.get("end")}.json",
         auth=BearerAuth(request.ctx.token_info["access_token"]),
     )
-    return json("Active minutes retrieved.", data.json())
+    return json("Active minutes retrieved.", data.json(), project=True)
 
 
 @fitbit_bp.get("heart-rate")
 async def on_get_heart_rate(request):
-    data = await http_client.get(
-        f"https://api.fitbit.com/1/user/{request.ctx.account.user_id}/activities/heart/date/"
-        f"{request.args.get("start")}/{request.args.get("end")}.json",
-        auth=BearerAuth(request.ctx.token_info["access_token"]),
+    """
+    Retrieves heart rate series. When a resolution (e.g., "15min", "1h") is provided, intraday heart rate is resampled
+    with the agg argument (mean, max, min, sum or count) and returned as timestamp and value columns, daily zone
+    minutes are returned as columns if the resolution is "1d" and agg is "zones". Intraday timestamps are in the
+    user's local time and ranges are limited to INTRADAY_MAX_DAYS.
+    """
+    if request.args.get("resolution"):
+        # Imported on first use as numpy is slow to import and only needed for resampling.
+        from active_boost.blueprints.fitbit.series import (
+            parse_resolution,
+            resolution_units,
+            get_columnar_intraday,
+            get_columnar_zones,
+        )
+
+        resolution = parse_resolution(request.args.get("resolution"))
+        aggregation = request.args.get("agg", "mean")
+        if resolution == resolution_units["d"] and aggregation == "zones":
+            series = await get_date_range(
+                request.ctx.account,
+                request.ctx.token_info,
+                "activities/heart",
+                request.args.get("start"),
+                request.args.get("end"),
+            )
+            data = series if "errors" in series else get_columnar_zones(series)
+        else:
+            windows = await get_date_range_windows(
+                request.ctx.account,
+                request.ctx.token_info,
+                "activities/heart",
+                request.args.get("start"),
+                request.args.get("end"),
+                "1min",
+            )
+            errors = [payload for _, payload in windows if "errors" in payload]
+            data = (
+                errors[0]
+                if errors
+                else get_columnar_intraday(windows, resolution, aggregation)
+            )
+        return json("Heart rate series retrieved.", data, project=True)
+    data = await get_date_range(
+        request.ctx.account,
+        request.ctx.token_info,
+        "activities/heart",
+        request.args.get("start"),
+        request.args.get("end"),
     )
-    return json("Heart rate series retrieved.", data.json())
+    return json("Heart rate series retrieved.", data, project=True)
 
 
 @fitbit_bp.get("frequent")
 async def on_get_frequent_activities(request):
-    data = await http_client.get(
+    data = await get_http_client().get(
         f"https://api.fitbit.com/1/user/{request.ctx.account.user_id}/activities/frequent.json",
         auth=BearerAuth(request.ctx.token_info["access_token"]),
     )
-    return json("Frequent activities retrieved.", data.json())
+    return json("Frequent activities retrieved.", data.json(), project=True)
 
 
 @fitbit_bp.get("recent")
 async def on_get_recent_activities(request):
-    data = await http_client.get(
+    data = await get_http_client().get(
         f"https://api.fitbit.com/1/user/{request.ctx.account.user_id}/activities/recent.json",
         auth=BearerAuth(request.ctx.token_info["access_token"]),
     )
-    return json("Recent activities retrieved.", data.json())
+    return json("Recent activities retrieved.", data.json(), project=True)
 
 
 @fitbit_bp.get("sleep")
 async def on_get_sleep(request):
-    data = await http_client.get(
-        f"https://api.fitbit.com/1/user/{request.ctx.account.user_id}/sleep/date/{request.args.get("start")}/"
-        f"{request.args.get("end")}.json",
-        auth=BearerAuth(request.ctx.token_info["access_token"]),
+    data = await get_date_range(
+        request.ctx.account,
+        request.ctx.token_info,
+        "sleep",
+        request.args.get("start"),
+        request.args.get("end"),
     )
-    return json("Sleep log retrieved.", data.json())
+    return json("Sleep log retrieved.", data, project=True)
 
 
 @fitbit_bp.get("spo2")
 async def on_get_spo2(request):
-    data = await http_client.get(
-        f"https://api.fitbit.com/1/user/{request.ctx.account.user_id}/spo2/date/{request.args.get("start")}/"
-        f"{request.args.get("end")}.json",
-        auth=BearerAuth(request.ctx.token_info["access_token"]),
+    data = await get_date_range(
+        request.ctx.account,
+        request.ctx.token_info,
+        "spo2",
+        request.args.get("start"),
+        request.args.get("end"),
     )
-    return json("SpO2 log retrieved.", data.json())
+    return json("SpO2 log retrieved.", data, project=True)
 
 
 @fitbit_bp.get("fitness-score")
 async def on_get_fitness_score(request):
-    data = await http_client.get(
+    data = await get_http_client().get(
         f"https://api.fitbit.com/1/user/{request.ctx.account.user_id}/cardioscore/date/{request.args.get("start")}/"
         f"{request.args.get("end")}.json",
         auth=BearerAuth(request.ctx.token_info["access_token"]),
     )
-    return json("Fitness score log retrieved.", data.json())
+    return json("Fitness score log retrieved.", data.json(), project=True)
 
 
 @fitbit_bp.get("body")
 async def on_get_body(request):
     if request.args.get("type") not in ["bmi", "fat", "weight"]:
         raise ValueError("Log type must be bmi, fat, weight.")
-    data = await http_client.get(
+    data = await get_http_client().get(
         f"https://api.fitbit.com/1/user/{request.ctx.account.user_id}/body/{request.args.get("type")}/date/"
         f"{request.args.get("start")}/{request.args.get("end")}.json",
         auth=BearerAuth(request.ctx.token_info["access_token"]),
     )
-    return json("Body log retrieved.", data.json())
+    return json("Body log retrieved.", data.json(), project=True)
+
+
+@fitbit_bp.post("subscription")
+async def on_subscribe(request):
+    """Subscribe to Fitbit change notifications so that account activity is synced as it changes."""
+    await FitbitCredential.update_or_create(
+        {"token_info": request.ctx.token_info, "deleted": False},
+        account=request.ctx.account,
+    )
+    data = await get_http_client().post(
+        f"https://api.fitbit.com/1/user/{request.ctx.account.user_id}/apiSubscriptions/{request.ctx.account.id}.json",
+        auth=BearerAuth(request.ctx.token_info["access_token"]),
+    )
+    return json("Subscribed to Fitbit change notifications.", data.json())
+
+
+@fitbit_bp.delete("subscription")
+async def on_unsubscribe(request):
+    """Unsubscribe from Fitbit change notifications and remove stored token information."""
+    await get_http_client().delete(
+        f"https://api.fitbit.com/1/user/{request.ctx.account.user_id}/apiSubscriptions/{request.ctx.account.id}.json",
+        auth=BearerAuth(request.ctx.token_info["access_token"]),
+    )
+    await FitbitCredential.filter(account=request.ctx.account).delete()
+    return json("Unsubscribed from Fitbit change notifications.", None)
+
+
+@fitbit_bp.get("webhook")
+async def on_verify_webhook(request):
+    """Respond to Fitbit subscriber verification."""
+    return empty(
+        204
+        if request.args.get("verify") == config.FITBIT_SUBSCRIBER_VERIFICATION
+        else 404
+    )
+
+
+@fitbit_bp.post("webhook")
+async def on_receive_webhook(request):
+    """Queue changes reported by Fitbit for syncing, Fitbit requires a response within five seconds."""
+    if not is_signature_valid(request.body, request.headers.get("X-Fitbit-Signature")):
+        return empty(404)
+    enqueue_notifications(request.json)
+    return empty()
 
 
 @fitbit_bp.exception(JSONDecodeError)
@@ -0,0 +1,176 @@
+import datetime
+import warnings
+
+import numpy as np
+
+from active_boost.blueprints.fitbit.models import DailyActivity
+from active_boost.blueprints.group.models import Group, Challenge
+
+statistic_percentiles = [25, 50, 75, 90]
+
+
+def to_list(values: np.ndarray) -> list:
+    """Converts an array to a json serializable list, NaN values become None."""
+    return [None if np.isnan(value) else float(value) for value in values]
+
+
+def get_activity_matrix(
+    rows: list[tuple], member_ids: list[int], start: datetime.date, days: int
+) -> np.ndarray:
+    """
+    Arranges daily activity rows into a member by day matrix, days without synced activity are NaN.
+
+    Args:
+        rows (list[tuple]): Account id, date and value of each daily activity.
+        member_ids (list[int]): Ids of the accounts represented by each matrix row.
+        start (date): Day represented by the first matrix column.
+        days (int): Amount of days represented by the matrix.
+
+    Returns:
+        matrix
+    """
+    matrix = np.full((len(member_ids), days), np.nan)
+    if rows:
+        member_index = {member_id: index for index, member_id in enumerate(member_ids)}
+        account_ids, dates, values = zip(*rows)
+        matrix[
+            np.fromiter((member_index[account_id] for account_id in account_ids), int),
+            np.fromiter(((date - start).days for date in dates), int),
+        ] = values
+    return matrix
+
+
+def get_activity_statistics(
+    matrix: np.ndarray,
+    member_ids: list[int],
+    start: datetime.date,
+    challenges: list[Challenge],
+) -> dict:
+    """
+    Computes member, weekly and challenge statistics of every member and day of an activity matrix at once. Statistics
+    across members exclude members that have not synced the days measured, unknown statistics are None.
+
+    Args:
+        matrix (np.ndarray): Member by day activity matrix.
+        member_ids (list[int]): Ids of the accounts represented by each matrix row.
+        start (date): Day represented by the first matrix column.
+        challenges (list[Challenge]): Challenges of the group measuring the same resource as the matrix.
+
+    Returns:
+        statistics
+    """
+    members, days = matrix.shape
+    synced = ~np.isnan(matrix)
+    activity = np.nan_to_num(matrix)
+    weeks = -(-days // 7)
+    padding = ((0, 0), (0, weeks * 7 - days))
+    weekly = np.pad(activity, padding).reshape(members, weeks, 7).sum(axis=2)
+    weekly_synced = np.pad(synced, padding).reshape(members, weeks, 7).any(axis=2)
+    # Weeks a member has not synced are excluded rather than counted as no activity.
+    weekly_per_member = np.where(weekly_synced, weekly, np.nan)
+    daily_totals = activity.sum(axis=0)
+    member_totals = activity.sum(axis=1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Weeks no member has synced.
+        percentiles = (
+            np.nanpercentile(weekly_per_member, statistic_percentiles, axis=0)
+            if members
+            else np.full((len(statistic_percentiles), weeks), np.nan)
+        )
+        weekly_means = (
+            np.nanmean(weekly_per_member, axis=0) if members else np.full(weeks, np.nan)
+        )
+    challenge_trends = []
+    for challenge in challenges:
+        first = max((challenge.date_created.date() - start).days, 0)
+        last = min((challenge.expiration_date.date() - start).days + 1, days)
+        challenge_synced = synced[:, first:last].any(axis=1)
+        challenge_totals = activity[challenge_synced, first:last].sum(axis=1)
+        challenge_trends.append(
+            {
+                "challenge": challenge.id,
+                "title": challenge.title,
+                "threshold": challenge.threshold,
+                "synced_members": int(challenge_synced.sum()),
+                "mean_total": (
+                    float(challenge_totals.mean()) if challenge_totals.size else None
+                ),
+                "threshold_met_ratio": (
+                    float((challenge_totals > challenge.threshold).mean())
+                    if challenge_totals.size
+                    else None
+                ),
+            }
+        )
+    return {
+        "start": str(start),
+        "days": days,
+        "total": float(daily_totals.sum()),
+        "daily_totals": daily_totals.tolist(),
+        "daily_trend": (
+            float(np.polyfit(np.arange(days), daily_totals, 1)[0]) if days > 1 else 0.0
+        ),
+        "weekly": {
+            "totals": weekly.sum(axis=0).tolist(),
+            "mean_per_member": to_list(weekly_means),
+            "percentiles_per_member": {
+                str(percentile): to_list(values)
+                for percentile, values in zip(statistic_percentiles, percentiles)
+            },
+        },
+        "members": [
+            {
+                "member": member_id,
+                "total": float(total),
+                "daily_mean": float(total / synced_days) if synced_days else None,
+                "weekly_totals": to_list(weekly_totals),
+                "synced_days": int(synced_days),
+            }
+            for member_id, total, weekly_totals, synced_days in zip(
+                member_ids, member_totals, weekly_per_member, synced.sum(axis=1)
+            )
+        ],
+        "challenges": challenge_trends,
+    }
+
+
+async def get_group_analytics(group: Group, resource: str, period: int) -> dict:
+    """
+    Computes activity statistics of all group members over the last period of days from locally synced activity.
+
+    Args:
+        group (Group): Group statistics are being computed for.
+        resource (str): Activity resource being measured (e.g., "distance", "steps", "calories").
+        period (int): Amount of days, ending today, statistics are computed over.
+
+    Returns:
+        statistics
+    """
+    end = datetime.datetime.now(datetime.UTC).date()
+    start = end - datetime.timedelta(days=period - 1)
+    member_ids = list(
+        await group.members.filter(deleted=False).values_list("id", flat=True)
+    )
+    rows = await DailyActivity.filter(
+        account_id__in=member_ids,
+        resource=resource,
+        date__gte=start,
+        date__lte=end,
+    ).values_list("account_id", "date", "value")
+    challenges = await Challenge.filter(
+        group=group,
+        threshold_type=resource,
+        deleted=False,
+        date_created__lte=datetime.datetime.combine(
+            end, datetime.time.max, datetime.UTC
+        ),
+        expiration_date__gte=datetime.datetime.combine(
+            start, datetime.time.min, datetime.UTC
+        ),
+    ).all()
+    return get_activity_statistics(
+        get_activity_matrix(rows, member_ids, start, period),
+        member_ids,
+        start,
+        challenges,
+    )
@@ -0,0 +1,195 @@
+from tortoise.transactions import in_transaction
+
+from active_boost.blueprints.group.models import Group, Challenge
+from active_boost.blueprints.security.models import Account
+from active_boost.common.util import config, global_leaderboard
+
+
+def get_account_ids(account_ids: list[str]) -> list[int | None]:
+    """
+    Parses account ids of a bulk operation, ids that are not numbers are retained as None. Repeated ids are removed so
+    that each account is reported once, in the order it was first provided.
+
+    Args:
+        account_ids (list[str]): Account ids provided in the request.
+
+    Raises:
+        ValueError
+
+    Returns:
+        account_ids
+    """
+    if not account_ids:
+        raise ValueError("At least one account must be provided.")
+    if len(account_ids) > config.BULK_MAX_ACCOUNTS:
+        raise ValueError(
+            f"No more than {config.BULK_MAX_ACCOUNTS} accounts can be provided."
+        )
+    return list(
+        dict.fromkeys(
+            int(account_id) if account_id.isdigit() else None
+            for account_id in account_ids
+        )
+    )
+
+
+async def get_accounts(account_ids: list[int | None], connection) -> dict:
+    """Retrieves accounts of a bulk operation by id, missing and deleted accounts are omitted."""
+    return {
+        account.id: account
+        for account in await Account.filter(
+            id__in=[account_id for account_id in account_ids if account_id],
+            deleted=False,
+        ).using_db(connection)
+    }
+
+
+async def get_related_ids(relation, account_ids, connection) -> set[int]:
+    """Retrieves ids of the accounts that are in a relation."""
+    return set(
+        await relation.filter(id__in=list(account_ids))
+        .using_db(connection)
+        .values_list("id", flat=True)
+    )
+
+
+async def update_accounts(
+    relation, account_ids: list[int | None], add: bool, connection
+) -> tuple[list[Account], list[dict]]:
+    """
+    Adds or removes accounts of a relation with one insert or delete.
+
+    Args:
+        relation (ManyToManyRelation): Group members or challenge participants being updated.
+        account_ids (list[int | None]): Ids of accounts being added or removed.
+        add (bool): Accounts are added if true, otherwise removed.
+        connection: Transaction the relation is updated in.
+
+    Returns:
+        updated accounts, results
+    """
+    accounts = await get_accounts(account_ids, connection)
+    existing = await get_related_ids(relation, accounts, connection)
+    updated = [
+        account
+        for account_id, account in accounts.items()
+        if (account_id in existing) != add
+    ]
+    if updated:
+        if add:
+            await relation.add(*updated, using_db=connection)
+        else:
+            await relation.remove(*updated, using_db=connection)
+    results = []
+    for account_id in account_ids:
+        if account_id not in accounts:
+            result = "not_found"
+        elif add:
+            result = "already_added" if account_id in existing else "added"
+        else:
+            result = "removed" if account_id in existing else "already_removed"
+        results.append({"account": account_id, "result": result})
+    return updated, results
+
+
+async def update_group_members(
+    group: Group, account_ids: list[int | None], add: bool
+) -> tuple[list[Account], list[dict]]:
+    """
+    Adds or removes many accounts from a group's members in one transaction.
+
+    Args:
+        group (Group): Group members are being updated for.
+        account_ids (list[int | None]): Ids of accounts being added or removed.
+        add (bool): Accounts are added if true, otherwise removed.
+
+    Returns:
+        updated accounts, results
+    """
+    async with in_transaction() as connection:
+        return await update_accounts(group.members, account_ids, add, connection)
+
+
+async def kick_challenge_participants(
+    challenge: Challenge, account_ids: list[int | None]
+) -> tuple[list[Account], list[dict]]:
+    """
+    Removes many accounts from a challenge's participants and finishers in one transaction, points of kicked finishers
+    are deducted from the global leaderboard.
+
+    Args:
+        challenge (Challenge): Challenge participants are being kicked from.
+        account_ids (list[int | None]): Ids of accounts being kicked.
+
+    Returns:
+        kicked accounts, results
+    """
+    async with in_transaction() as connection:
+        accounts = await get_accounts(account_ids, connection)
+        participating = await get_related_ids(
+            challenge.participants, accounts, connection
+        )
+        finished = await get_related_ids(challenge.finishers, accounts, connection)
+        for relation, related_ids in [
+            (challenge.participants, participating),
+            (challenge.finishers, finished),
+        ]:
+            if related_ids:
+                await relation.remove(
+                    *[accounts[account_id] for account_id in related_ids],
+                    using_db=connection,
+                )
+    for account_id in finished:
+        global_leaderboard.add(account_id, -challenge.reward)
+    kicked = [
+        account
+        for account_id, account in accounts.items()
+        if account_id in participating or account_id in finished
+    ]
+    results = [
+        {
+            "account": account_id,
+            "result": (
+                "not_found"
+                if account_id not in accounts
+                else (
+                    "removed"
+                    if account_id in participating or account_id in finished
+                    else "already_removed"
+                )
+            ),
+            "fitness_points": -challenge.reward if account_id in finished else 0,
+        }
+        for account_id in account_ids
+    ]
+    return kicked, results
+
+
+async def enroll_group_members(
+    challenge: Challenge,
+) -> tuple[list[Account], list[dict]]:
+    """
+    Adds every member of the challenge's group that has not finished it to its participants in one transaction.
+
+    Args:
+        challenge (Challenge): Challenge group members are being enrolled in.
+
+    Returns:
+        enrolled accounts, results
+    """
+    async with in_transaction() as connection:
+        member_ids = await (
+            Account.filter(memberships__id=challenge.group_id, deleted=False)
+            .using_db(connection)
+            .values_list("id", flat=True)
+        )
+        finished = await get_related_ids(challenge.finishers, member_ids, connection)
+        enrolled, results = await update_accounts(
+            challenge.participants,
+            [member_id for member_id in member_ids if member_id not in finished],
+            True,
+            connection,
+        )
+    return enrolled, results + [
+        {"account": member_id, "result": "finished"} for member_id in finished
+    ]
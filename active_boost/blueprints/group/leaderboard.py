@@ -0,0 +1,44 @@
+import asyncio
+
+from sanic import Sanic
+from tortoise.expressions import Q
+from tortoise.functions import Sum
+
+from active_boost.blueprints.group.models import Challenge
+from active_boost.blueprints.security.models import Account
+from active_boost.common.util import config, global_leaderboard
+
+
+async def rebuild_leaderboard() -> None:
+    """Ranks all accounts by the points accrued from completed challenges across every group."""
+    rows = (
+        await Account.filter(deleted=False)
+        .annotate(points=Sum("finisher__reward", _filter=Q(finisher__deleted=False)))
+        .values("id", "points")
+    )
+    global_leaderboard.rebuild(
+        {row["id"]: int(row["points"]) for row in rows if row["points"]}
+    )
+
+
+async def adjust_finisher_points(challenge: Challenge, points: int) -> None:
+    """Adds points to all finishers of a challenge in the global leaderboard, points may be negative."""
+    if points:
+        for account_id in await challenge.finishers.filter(deleted=False).values_list(
+            "id", flat=True
+        ):
+            global_leaderboard.add(account_id, points)
+
+
+def initialize_leaderboard(app: Sanic) -> None:
+    async def leaderboard_rebuilder():
+        """Periodically rebuilds the leaderboard so that workers converge on changes made by other workers."""
+        while True:
+            await asyncio.sleep(config.LEADERBOARD_REBUILD_INTERVAL)
+            await rebuild_leaderboard()
+
+    @app.after_server_start
+    async def leaderboard_initializer(app, loop):
+        """Ranks all accounts once the database is available."""
+        await rebuild_leaderboard()
+        app.add_task(leaderboard_rebuilder(), name="leaderboard_rebuilder")
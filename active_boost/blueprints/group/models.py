@@ -33,14 +33,22 @@ class Group(BaseModel):
     members: fields.ManyToManyRelation["Account"] = fields.ManyToManyField(
         "models.Account", through="group_member", related_name="memberships"
     )
+    json_fields = {
+        "date_created": "date_created",
+        "date_updated": "date_updated",
+        "id": "id",
+        "title": "title",
+        "description": "description",
+        "invite_code": "invite_code",
+        "private": "private",
+        "founder": "founder__username",
+    }
 
     @classmethod
-    async def get_all_from_member(cls, account: Account):
+    def get_all_from_member(cls, account: Account):
         """Retrieve all groups account has joined."""
-        return (
-            await cls.filter(members__in=[account], deleted=False)
-            .prefetch_related("members", "founder")
-            .all()
+        return cls.filter(members__in=[account], deleted=False).prefetch_related(
+            "founder"
         )
 
     @classmethod
@@ -101,6 +109,18 @@ class Challenge(BaseModel):
     finishers: fields.ManyToManyRelation["Account"] = fields.ManyToManyField(
         "models.Account", through="challenge_finisher", related_name="finisher"
     )
+    json_fields = {
+        "date_created": "date_created",
+        "date_updated": "date_updated",
+        "id": "id",
+        "title": "title",
+        "description": "description",
+        "reward": "reward",
+        "completion_threshold": "threshold",
+        "threshold_type": "threshold_type",
+        "expiration_date": "expiration_date",
+        "group": "group__title",
+    }
 
     @property
     def json(self) -> dict:
@@ -122,13 +142,11 @@ class Challenge(BaseModel):
         return datetime.datetime.now(datetime.timezone.utc) >= self.expiration_date
 
     @classmethod
-    async def get_all_from_participant(cls, account: Account):
+    def get_all_from_participant(cls, account: Account):
         """Retrieve all challenges that account is participating in."""
-        return (
-            await cls.filter(participants__in=[account.id], deleted=False)
-            .prefetch_related("group")
-            .all()
-        )
+        return cls.filter(
+            participants__in=[account.id], deleted=False
+        ).prefetch_related("group")
 
     @classmethod
     async def get_from_participant(cls, request: Request, account: Account):
@@ -140,12 +158,12 @@ class Challenge(BaseModel):
         )
 
     @classmethod
-    async def get_all_from_group(cls, request: Request, group=None):
+    def get_all_from_group(cls, request: Request, group=None):
         """Retrieve all challenges associated with group."""
-        return await cls.filter(
+        return cls.filter(
             group=group or request.args.get("group") or request.args.get("id"),
             deleted=False,
-        ).all()
+        )
 
     @classmethod
     async def get_from_group(cls, request: Request):
@@ -0,0 +1,139 @@
+import asyncio
+import traceback
+
+from tortoise import Tortoise
+
+from active_boost.blueprints.fitbit.client import (
+    get_activity_series,
+    get_activity_total,
+)
+from active_boost.blueprints.fitbit.models import DailyActivity, FitbitCredential
+from active_boost.blueprints.fitbit.subscription import get_token_info
+from active_boost.blueprints.group.models import Challenge
+from active_boost.blueprints.security.models import Account
+from active_boost.common.util import config
+
+
+async def get_participants(challenge: Challenge) -> list[dict]:
+    """
+    Retrieves json of every account participating in or having finished a challenge along with whether it finished,
+    in a single query.
+
+    Args:
+        challenge (Challenge): Challenge participants are being retrieved for.
+
+    Returns:
+        participants
+    """
+    connection = Tortoise.get_connection("default")
+    placeholder = "?" if connection.capabilities.dialect == "sqlite" else "%s"
+    columns = ", ".join(
+        f"a.{column} AS {key}" for key, column in Account.json_fields.items()
+    )
+    _, rows = await connection.execute_query(
+        f"SELECT {columns}, m.finished AS finished FROM account a JOIN ("
+        f"SELECT account_id, 0 AS finished FROM challenge_participant WHERE challenge_id = {placeholder} "
+        f"UNION ALL SELECT account_id, 1 AS finished FROM challenge_finisher WHERE challenge_id = {placeholder}"
+        ") m ON m.account_id = a.id WHERE a.deleted = 0",
+        [challenge.id, challenge.id],
+    )
+    return [
+        {
+            "member": {
+                key: str(row[key]) if key.startswith("date_") else row[key]
+                for key in Account.json_fields
+            },
+            "finished": bool(row["finished"]),
+        }
+        for row in rows
+    ]
+
+
+async def get_challenge_progress(
+    challenge: Challenge, account: Account, token_info: dict
+) -> list[dict]:
+    """
+    Retrieves each participant's activity total towards the challenge threshold. Totals of participants subscribed to
+    Fitbit change notifications, and of the requesting account, are retrieved from Fitbit concurrently, totals of other
+    participants are computed from their locally synced activity.
+
+    Args:
+        challenge (Challenge): Challenge progress is being retrieved for.
+        account (Account): Account retrieving progress.
+        token_info (dict): OAuth token information of the account retrieving progress.
+
+    Returns:
+        progress
+    """
+    participants = await get_participants(challenge)
+    ids = [participant["member"]["id"] for participant in participants]
+    credentials = {
+        credential.account_id: credential
+        for credential in await FitbitCredential.filter(
+            account_id__in=ids, deleted=False
+        ).prefetch_related("account")
+    }
+    semaphore = asyncio.Semaphore(config.PROGRESS_CONCURRENCY)
+
+    async def get_total(participant_id):
+        async with semaphore:
+            if participant_id == account.id:
+                participant, participant_token_info = account, token_info
+            else:
+                participant = credentials[participant_id].account
+                participant_token_info = await get_token_info(
+                    credentials[participant_id]
+                )
+            series = await get_activity_series(
+                participant,
+                participant_token_info,
+                challenge.threshold_type,
+                challenge.date_created.strftime("%Y-%m-%d"),
+                challenge.expiration_date.strftime("%Y-%m-%d"),
+            )
+            return get_activity_total(series, challenge.threshold_type)
+
+    upstream_ids = [
+        participant_id
+        for participant_id in ids
+        if participant_id == account.id or participant_id in credentials
+    ]
+    totals = {}
+    for participant_id, total in zip(
+        upstream_ids,
+        await asyncio.gather(
+            *[get_total(participant_id) for participant_id in upstream_ids],
+            return_exceptions=True,
+        ),
+    ):
+        if isinstance(total, Exception):
+            traceback.print_exception(total)
+        else:
+            totals[participant_id] = total
+    synced_ids = set(totals)
+    local_ids = [
+        participant_id for participant_id in ids if participant_id not in totals
+    ]
+    if local_ids:
+        # Each day is rounded before summing as with totals retrieved from Fitbit, which redemption is measured by.
+        for account_id, value in await DailyActivity.filter(
+            account_id__in=local_ids,
+            resource=challenge.threshold_type,
+            date__gte=challenge.date_created.date(),
+            date__lte=challenge.expiration_date.date(),
+        ).values_list("account_id", "value"):
+            totals[account_id] = totals.get(account_id, 0) + round(value)
+    return [
+        participant
+        | {
+            "total": totals.get(participant["member"]["id"], 0),
+            "threshold": challenge.threshold,
+            "remaining": max(
+                challenge.threshold - totals.get(participant["member"]["id"], 0), 0
+            ),
+            "source": (
+                "fitbit" if participant["member"]["id"] in synced_ids else "local"
+            ),
+        }
+        for participant in participants
+    ]
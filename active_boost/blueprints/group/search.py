@@ -0,0 +1,162 @@
+from sanic import Sanic
+from tortoise import Tortoise
+from tortoise.signals import post_save, post_delete
+
+from active_boost.blueprints.group.models import Group, Challenge
+
+# Rows in the SQLite index use rowid = document id * 2 + kind so that a document can be replaced or removed without
+# scanning the index, MySQL keeps FULLTEXT indexes directly on the group and challenge tables instead.
+search_kinds = ["group", "challenge"]
+
+
+def get_connection():
+    """Retrieves the connection the search index is stored in."""
+    return Tortoise.get_connection("default")
+
+
+def get_search_rowid(instance: Group | Challenge) -> int:
+    """Retrieves SQLite index rowid of a group or challenge."""
+    return instance.id * 2 + (1 if isinstance(instance, Challenge) else 0)
+
+
+def get_fts_query(query: str) -> str:
+    """Converts user input into an FTS5 query of quoted prefix terms so that syntax characters are not interpreted."""
+    return " ".join(
+        '"' + term.replace('"', '""') + '"*'
+        for term in query.split()
+        if term.strip('"')
+    )
+
+
+async def index_document(instance: Group | Challenge) -> None:
+    """Adds or replaces a group or challenge in the search index, soft deleted models are removed from it."""
+    connection = get_connection()
+    if connection.capabilities.dialect != "sqlite":
+        return
+    await connection.execute_query(
+        "DELETE FROM search_index WHERE rowid = ?", [get_search_rowid(instance)]
+    )
+    if not instance.deleted:
+        await connection.execute_query(
+            "INSERT INTO search_index (rowid, group_id, title, description) VALUES (?, ?, ?, ?)",
+            [
+                get_search_rowid(instance),
+                instance.group_id if isinstance(instance, Challenge) else instance.id,
+                instance.title,
+                instance.description,
+            ],
+        )
+
+
+async def remove_document(instance: Group | Challenge) -> None:
+    """Removes a group or challenge from the search index."""
+    connection = get_connection()
+    if connection.capabilities.dialect == "sqlite":
+        await connection.execute_query(
+            "DELETE FROM search_index WHERE rowid = ?", [get_search_rowid(instance)]
+        )
+
+
+@post_save(Group, Challenge)
+async def search_index_save_signal(sender, instance, created, using_db, update_fields):
+    """Keeps the search index in sync with group and challenge creation, updates and soft deletion."""
+    await index_document(instance)
+
+
+@post_delete(Group, Challenge)
+async def search_index_delete_signal(sender, instance, using_db):
+    """Keeps the search index in sync with group and challenge removal."""
+    await remove_document(instance)
+
+
+async def search(query: str, page: int = 1, per_page: int = 20) -> list[dict]:
+    """
+    Retrieves public groups and challenges of public groups matching the query, best matches first.
+
+    Args:
+        query (str): Terms being searched for within titles and descriptions.
+        page (int): Page of results being retrieved, starting at 1.
+        per_page (int): Amount of results per page.
+
+    Returns:
+        results
+    """
+    connection = get_connection()
+    offset = (max(page, 1) - 1) * per_page
+    if connection.capabilities.dialect == "sqlite":
+        fts_query = get_fts_query(query)
+        if not fts_query:
+            return []
+        _, rows = await connection.execute_query(
+            'SELECT search_index.rowid AS rowid, search_index.rank AS score FROM search_index JOIN "group" g '
+            "ON g.id = search_index.group_id WHERE search_index MATCH ? AND g.private = 0 AND g.deleted = 0 "
+            "ORDER BY search_index.rank LIMIT ? OFFSET ?",
+            [fts_query, per_page, offset],
+        )
+        matches = [
+            (search_kinds[row["rowid"] % 2], row["rowid"] // 2, -row["score"])
+            for row in rows
+        ]
+    else:
+        _, rows = await connection.execute_query(
+            "(SELECT 'group' AS kind, g.id AS doc_id, MATCH (g.title, g.description) AGAINST (%s) AS score "
+            "FROM `group` g WHERE g.private = 0 AND g.deleted = 0 AND MATCH (g.title, g.description) AGAINST (%s)) "
+            "UNION ALL (SELECT 'challenge' AS kind, c.id AS doc_id, MATCH (c.title, c.description) AGAINST (%s) "
+            "AS score FROM challenge c JOIN `group` g ON g.id = c.group_id WHERE c.deleted = 0 AND g.private = 0 "
+            "AND g.deleted = 0 AND MATCH (c.title, c.description) AGAINST (%s)) "
+            "ORDER BY score DESC LIMIT %s OFFSET %s",
+            [query, query, query, query, per_page, offset],
+        )
+        matches = [(row["kind"], row["doc_id"], row["score"]) for row in rows]
+    groups = {
+        group.id: group
+        for group in await Group.filter(
+            id__in=[doc_id for kind, doc_id, _ in matches if kind == "group"]
+        ).prefetch_related("founder")
+    }
+    challenges = {
+        challenge.id: challenge
+        for challenge in await Challenge.filter(
+            id__in=[doc_id for kind, doc_id, _ in matches if kind == "challenge"]
+        ).prefetch_related("group")
+    }
+    results = []
+    for kind, doc_id, score in matches:
+        document = (groups if kind == "group" else challenges).get(doc_id)
+        if document:
+            results.append(
+                {"type": kind, "score": float(score), "result": document.json}
+            )
+    return results
+
+
+def initialize_search(app: Sanic) -> None:
+    @app.before_server_start
+    async def search_index_initializer(app, loop):
+        """Creates search indexes if they do not exist yet and populates them with existing groups and challenges."""
+        connection = get_connection()
+        if connection.capabilities.dialect == "sqlite":
+            _, rows = await connection.execute_query(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'search_index'"
+            )
+            if rows:
+                return
+            await connection.execute_script(
+                "CREATE VIRTUAL TABLE search_index USING fts5("
+                "group_id UNINDEXED, title, description, tokenize = 'porter unicode61');"
+                "INSERT INTO search_index (rowid, group_id, title, description) "
+                'SELECT id * 2, id, title, description FROM "group" WHERE deleted = 0;'
+                "INSERT INTO search_index (rowid, group_id, title, description) "
+                "SELECT id * 2 + 1, group_id, title, description FROM challenge WHERE deleted = 0;"
+            )
+        else:
+            for table in ["group", "challenge"]:
+                _, rows = await connection.execute_query(
+                    "SELECT 1 FROM information_schema.statistics WHERE table_schema = DATABASE() "
+                    "AND table_name = %s AND index_name = %s",
+                    [table, f"{table}_search_index"],
+                )
+                if not rows:
+                    await connection.execute_script(
+                        f"ALTER TABLE `{table}` ADD FULLTEXT INDEX {table}_search_index (title, description);"
+                    )
@@ -1,7 +1,23 @@
+import asyncio
+
 from sanic import Blueprint
 from sanic.utils import str_to_bool
 
+from active_boost.blueprints.fitbit.client import (
+    get_activity_series,
+    get_activity_total,
+)
+from active_boost.blueprints.group.bulk import (
+    get_account_ids,
+    update_group_members,
+    kick_challenge_participants,
+    enroll_group_members,
+)
+from active_boost.blueprints.group.leaderboard import adjust_finisher_points
 from active_boost.blueprints.group.models import Group, Challenge
+from active_boost.blueprints.group.progress import get_challenge_progress
+from active_boost.blueprints.group.search import search
+from active_boost.blueprints.job.view import get_submitted_job, submit_job
 from active_boost.blueprints.security.models import Account
 from active_boost.blueprints.security.view import requires_ownership
 from active_boost.common.exceptions import (
@@ -9,12 +25,15 @@ from active_boost.common.exceptions import (
     ThresholdNotMetError,
     InvalidThresholdTypeError,
 )
-from active_boost.common.models import BearerAuth
 from active_boost.common.util import (
     json,
-    http_client,
     get_expiration_date,
     activity_resource_options,
+    analytics_cache,
+    progress_cache,
+    group_broker,
+    global_leaderboard,
+    config,
 )
 
 group_bp = Blueprint("group", url_prefix="group")
@@ -24,15 +43,15 @@ challenge_bp = Blueprint("challenge", url_prefix="group/challenge")
 @group_bp.get("you")
 async def on_get_user_groups(request):
     """Retrieves groups associated with user."""
-    groups = await Group.get_all_from_member(request.ctx.account)
-    return json("User groups retrieved.", [group.json for group in groups])
+    groups = await Group.get_all_json(Group.get_all_from_member(request.ctx.account))
+    return json("User groups retrieved.", groups)
 
 
 @group_bp.get("members")
 async def on_get_group_members(request):
     group = await Group.get_from_member(request, request.ctx.account)
-    members = await group.members.filter(deleted=False).all()
-    return json("Group members retrieved.", [member.json for member in members])
+    members = await Account.get_all_json(group.members.filter(deleted=False))
+    return json("Group members retrieved.", members)
 
 
 @group_bp.get("leaderboard")
@@ -56,18 +75,118 @@ async def on_get_group_leaderboard(request):
             }
         )
         leaderboard.sort(key=lambda x: x["fitness_points"], reverse=True)
-    return json("Leaderboard retrieved.", leaderboard)
+    return json("Leaderboard retrieved.", leaderboard, project=["member"])
+
+
+@group_bp.get("leaderboard/global")
+async def on_get_global_leaderboard(request):
+    """Retrieves the highest ranked accounts by points accrued from completed challenges across all groups."""
+    ranking = global_leaderboard.top(
+        max(min(int(request.args.get("limit", 10)), 100), 1)
+    )
+    accounts = {
+        account.id: account
+        for account in await Account.filter(
+            id__in=[account_id for _, account_id, _ in ranking]
+        )
+    }
+    return json(
+        "Global leaderboard retrieved.",
+        [
+            {
+                "rank": rank,
+                "member": accounts[account_id].json,
+                "fitness_points": points,
+            }
+            for rank, account_id, points in ranking
+            if account_id in accounts
+        ],
+        project=["member"],
+    )
+
+
+@group_bp.get("leaderboard/rank")
+async def on_get_global_rank(request):
+    """Retrieves the account's rank by points accrued from completed challenges across all groups."""
+    rank = global_leaderboard.rank(request.ctx.account.id)
+    return json(
+        "Global rank retrieved.",
+        {
+            "rank": rank[0] if rank else None,
+            "member": request.ctx.account.json,
+            "fitness_points": rank[1] if rank else 0,
+        },
+        project=["member"],
+    )
+
+
+@group_bp.websocket("updates")
+async def on_group_updates(request, ws):
+    """
+    Pushes membership, challenge and leaderboard changes of a group the account is a member in as they occur, a
+    heartbeat is sent whenever the group has been idle for the heartbeat interval. The connection is closed once the
+    account leaves or is kicked or the group is deleted, membership is also rechecked with each heartbeat as changes
+    made by other workers are not published to this one.
+    """
+    group = await Group.get_from_member(request, request.ctx.account)
+    queue = group_broker.subscribe(group.id, request.ctx.account.id)
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    queue.get(), config.GROUP_HEARTBEAT_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                if not await Group.filter(
+                    id=group.id, members__in=[request.ctx.account], deleted=False
+                ).exists():
+                    break
+                message = '{"event": "heartbeat", "data": null}'
+            if message is None:
+                break
+            await ws.send(message)
+        await ws.close(reason="No longer a member of the group.")
+    finally:
+        group_broker.unsubscribe(group.id, queue)
+
+
+@group_bp.get("analytics")
+async def on_get_group_analytics(request):
+    """Retrieves activity statistics of all members in a group computed from their locally synced activity."""
+    group = await Group.get_from_member(request, request.ctx.account)
+    if request.args.get("type") not in activity_resource_options:
+        raise ValueError(f"Log type must be {", ".join(activity_resource_options)}.")
+    period = max(min(int(request.args.get("period", 28)), 366), 1)
+    key = (group.id, request.args.get("type"), period)
+    analytics = analytics_cache.get(key)
+    if not analytics:
+        # Imported on first use as numpy is slow to import and only needed for analytics.
+        from active_boost.blueprints.group.analytics import get_group_analytics
+
+        analytics = await get_group_analytics(group, request.args.get("type"), period)
+        analytics_cache.set(key, analytics)
+    request.ctx.cache_encodings = analytics_cache.get_encodings(key)
+    return json("Group analytics retrieved.", analytics)
 
 
 @group_bp.get("/")
 async def on_get_all_public_groups(request):
     """Retrieves all groups not marked as private."""
-    groups = (
-        await Group.filter(deleted=False, private=False)
-        .prefetch_related("founder")
-        .all()
+    groups = await Group.get_all_json(
+        Group.filter(deleted=False, private=False).prefetch_related("founder")
+    )
+    return json("Public groups retrieved.", groups)
+
+
+@group_bp.get("search")
+async def on_search_public_groups(request):
+    """Retrieves public groups and challenges ranked by how well their title and description match the query."""
+    results = await search(
+        request.args.get("q", ""),
+        int(request.args.get("page", 1)),
+        max(min(int(request.args.get("per-page", 20)), 100), 1),
     )
-    return json("Public groups retrieved.", [group.json for group in groups])
+    return json("Search results retrieved.", results, project=["result"])
 
 
 @group_bp.post("/")
@@ -80,7 +199,7 @@ async def on_create_group(request):
         founder=request.ctx.account,
     )
     await group.members.add(request.ctx.account)
-    return json("Group created.", group.json)
+    return json("Group created.", group.json, project=True)
 
 
 @group_bp.put("/")
@@ -92,7 +211,8 @@ async def on_update_group(request):
     group.description = request.form.get("description")
     group.private = str_to_bool(request.form.get("private"))
     await group.save(update_fields=["title", "description", "private"])
-    return json("Group updated.", group.json)
+    group_broker.publish(group.id, "group_updated", group.json)
+    return json("Group updated.", group.json, project=True)
 
 
 @group_bp.delete("/")
@@ -102,7 +222,9 @@ async def on_delete_group(request):
     group = await Group.get(id=request.args.get("id"), deleted=False)
     group.deleted = True
     await group.save(update_fields=["deleted"])
-    return json("Group deleted.", group.json)
+    group_broker.publish(group.id, "group_deleted", group.json)
+    group_broker.close(group.id)
+    return json("Group deleted.", group.json, project=True)
 
 
 @group_bp.put("join")
@@ -113,7 +235,8 @@ async def on_join_group(request):
         deleted=False,
     )
     await group.members.add(request.ctx.account)
-    return json("Group joined.", group.json)
+    group_broker.publish(group.id, "member_joined", request.ctx.account.json)
+    return json("Group joined.", group.json, project=True)
 
 
 @group_bp.put("leave")
@@ -121,7 +244,9 @@ async def on_leave_group(request):
     """Join group and be added to its members list."""
     group = await Group.get_from_member(request, request.ctx.account)
     await group.members.remove(request.ctx.account)
-    return json("Group left successfully.", group.json)
+    group_broker.publish(group.id, "member_left", request.ctx.account.json)
+    group_broker.close(group.id, [request.ctx.account.id])
+    return json("Group left successfully.", group.json, project=True)
 
 
 @group_bp.put("kick")
@@ -131,38 +256,95 @@ async def on_kick_group_member(request):
     group = await Group.get(id=request.args.get("id"), deleted=False)
     account = await Account.get(id=request.args.get("account"), deleted=False)
     await group.members.remove(account)
+    group_broker.publish(group.id, "member_kicked", account.json)
+    group_broker.close(group.id, [account.id])
     return json(
         "Member kicked from group.",
         {"account_kicked": account.json, "group": group.json},
+        project=["account_kicked", "group"],
+    )
+
+
+@group_bp.put("invite")
+@requires_ownership
+async def on_invite_group_members(request):
+    """Add many accounts to group members list, each account's result is reported."""
+    group = await Group.get(id=request.args.get("id"), deleted=False)
+    added, results = await update_group_members(
+        group, get_account_ids(request.args.getlist("account")), True
+    )
+    if added:
+        group_broker.publish(
+            group.id, "members_invited", [account.json for account in added]
+        )
+    return json(
+        "Members invited to group.",
+        {"results": results, "group": group.json},
+        project=["group"],
+    )
+
+
+@group_bp.put("kick/bulk")
+@requires_ownership
+async def on_kick_group_members(request):
+    """Remove many accounts from group members list, each account's result is reported."""
+    group = await Group.get(id=request.args.get("id"), deleted=False)
+    kicked, results = await update_group_members(
+        group, get_account_ids(request.args.getlist("account")), False
+    )
+    if kicked:
+        group_broker.publish(
+            group.id, "members_kicked", [account.json for account in kicked]
+        )
+        group_broker.close(group.id, [account.id for account in kicked])
+    return json(
+        "Members kicked from group.",
+        {"results": results, "group": group.json},
+        project=["group"],
     )
 
 
 @challenge_bp.get("you")
 async def on_get_user_challenges(request):
     """Retrieves challenges associated with user."""
-    challenges = await Challenge.get_all_from_participant(request.ctx.account)
-    return json(
-        "User challenges retrieved.", [challenge.json for challenge in challenges]
+    challenges = await Challenge.get_all_json(
+        Challenge.get_all_from_participant(request.ctx.account)
     )
+    return json("User challenges retrieved.", challenges)
 
 
 @challenge_bp.get("participants")
 async def on_get_challenge_participants(request):
     """Retrieves users who have joined the challenge and completed the challenge."""
     challenge = await Challenge.get_from_group(request)
-    participants = await challenge.participants.filter(deleted=False).all()
-    finishers = await challenge.participants.filter(deleted=False).all()
-    return json(
-        "Challenge participants retrieved.",
-        [participant.json for participant in participants],
+    participants = await Account.get_all_json(
+        challenge.participants.filter(deleted=False)
     )
+    return json("Challenge participants retrieved.", participants)
+
+
+@challenge_bp.get("progress")
+@requires_ownership
+async def on_get_challenge_progress(request):
+    """Retrieves every participant's activity total towards the challenge threshold and whether they finished."""
+    challenge = await Challenge.get_from_group(request)
+    progress = progress_cache.get(challenge.id)
+    if not progress:
+        progress = await get_challenge_progress(
+            challenge, request.ctx.account, request.ctx.token_info
+        )
+        progress_cache.set(challenge.id, progress)
+    request.ctx.cache_encodings = progress_cache.get_encodings(challenge.id)
+    return json("Challenge progress retrieved.", progress)
 
 
 @challenge_bp.get("/")
 async def on_get_challenges(request):
     """Retrieve all challenges associated with a group."""
-    challenges = await Challenge.get_all_from_group(request)
-    return json("Challenges retrieved.", [challenge.json for challenge in challenges])
+    challenges = await Challenge.get_all_json(
+        Challenge.get_all_from_group(request).prefetch_related("group")
+    )
+    return json("Challenges retrieved.", challenges)
 
 
 @challenge_bp.post("/")
@@ -182,7 +364,8 @@ async def on_create_challenge(request):
         challenger=request.ctx.account,
         group=group,
     )
-    return json("Challenge created.", challenge.json)
+    group_broker.publish(group.id, "challenge_created", challenge.json)
+    return json("Challenge created.", challenge.json, project=True)
 
 
 @challenge_bp.put("/")
@@ -190,6 +373,7 @@ async def on_create_challenge(request):
 async def on_update_challenge(request):
     """Update challenge information if permitted."""
     challenge = await Challenge.get_from_group(request)
+    previous_reward = challenge.reward
     challenge.title = request.form.get("title")
     challenge.description = request.form.get("description")
     challenge.reward = request.form.get("reward")
@@ -209,7 +393,9 @@ async def on_update_challenge(request):
             "threshold_type",
         ]
     )
-    return json("Challenge updated.", challenge.json)
+    await adjust_finisher_points(challenge, int(challenge.reward) - previous_reward)
+    group_broker.publish(challenge.group_id, "challenge_updated", challenge.json)
+    return json("Challenge updated.", challenge.json, project=True)
 
 
 @challenge_bp.delete("/")
@@ -219,7 +405,9 @@ async def on_delete_challenge(request):
     challenge = await Challenge.get_from_group(request)
     challenge.deleted = True
     await challenge.save(update_fields=["deleted"])
-    return json("Challenge deleted.", challenge.json)
+    await adjust_finisher_points(challenge, -challenge.reward)
+    group_broker.publish(challenge.group_id, "challenge_deleted", challenge.json)
+    return json("Challenge deleted.", challenge.json, project=True)
 
 
 @challenge_bp.put("join")
@@ -227,7 +415,12 @@ async def on_join_challenge(request):
     """Join challenge and be added to its participants list."""
     challenge = await Challenge.get_from_group_and_member(request, request.ctx.account)
     await challenge.participants.add(request.ctx.account)
-    return json("Challenge joined.", challenge.json)
+    group_broker.publish(
+        challenge.group_id,
+        "challenge_joined",
+        {"member": request.ctx.account.json, "challenge": challenge.json},
+    )
+    return json("Challenge joined.", challenge.json, project=True)
 
 
 @challenge_bp.put("kick")
@@ -236,40 +429,149 @@ async def on_kick_challenge_participant(request):
     """Remove account from challenge participants list."""
     challenge = await Challenge.get_from_group_and_member(request, request.ctx.account)
     account = await Account.get(id=request.args.get("account"), deleted=False)
+    finished = await challenge.finishers.filter(id=account.id).exists()
     await challenge.participants.remove(account)
     await challenge.finishers.remove(account)
+    if finished:
+        global_leaderboard.add(account.id, -challenge.reward)
+    group_broker.publish(
+        challenge.group_id,
+        "participant_kicked",
+        {
+            "member": account.json,
+            "challenge": challenge.json,
+            "fitness_points": -challenge.reward if finished else 0,
+        },
+    )
     return json(
         "Participant kicked from challenge.",
         {"account_kicked": account.json, "challenge": challenge.json},
+        project=["account_kicked", "challenge"],
     )
 
 
-@challenge_bp.put("redeem")
-async def on_challenge_redeem(request):
+@challenge_bp.put("kick/bulk")
+@requires_ownership
+async def on_kick_challenge_participants(request):
+    """Remove many accounts from challenge participants list, each account's result is reported."""
+    challenge = await Challenge.get_from_group_and_member(request, request.ctx.account)
+    kicked, results = await kick_challenge_participants(
+        challenge, get_account_ids(request.args.getlist("account"))
+    )
+    if kicked:
+        points = {result["account"]: result["fitness_points"] for result in results}
+        group_broker.publish(
+            challenge.group_id,
+            "participants_kicked",
+            {
+                "members": [
+                    account.json | {"fitness_points": points[account.id]}
+                    for account in kicked
+                ],
+                "challenge": challenge.json,
+            },
+        )
+    return json(
+        "Participants kicked from challenge.",
+        {"results": results, "challenge": challenge.json},
+        project=["challenge"],
+    )
+
+
+@challenge_bp.put("enroll")
+@requires_ownership
+async def on_enroll_group_members(request):
+    """Add every group member to challenge participants list, each member's result is reported."""
+    challenge = await Challenge.get_from_group_and_member(request, request.ctx.account)
+    enrolled, results = await enroll_group_members(challenge)
+    if enrolled:
+        group_broker.publish(
+            challenge.group_id,
+            "challenge_enrolled",
+            {
+                "members": [account.json for account in enrolled],
+                "challenge": challenge.json,
+            },
+        )
+    return json(
+        "Group members enrolled in challenge.",
+        {"results": results, "challenge": challenge.json},
+        project=["challenge"],
+    )
+
+
+async def redeem_challenge(
+    account: Account, token_info: dict, challenge: Challenge
+) -> dict:
     """
-    Adds user to challenge finishers list if threshold attempt (e.g., "distance", "steps", "calories") exceeds
+    Adds account to challenge finishers list if threshold attempt (e.g., "distance", "steps", "calories") exceeds
     challenge requirements.
+
+    Args:
+        account (Account): Account redeeming the challenge.
+        token_info (dict): OAuth token information of the account.
+        challenge (Challenge): Challenge being redeemed.
+
+    Raises:
+        ChallengeExpiredError
+        ThresholdNotMetError
+
+    Returns:
+        challenge
     """
-    challenge = await Challenge.get_from_participant(request, request.ctx.account)
     if challenge.has_expired():
-        await challenge.participants.remove(request.ctx.account)
+        await challenge.participants.remove(account)
         raise ChallengeExpiredError()
     else:
-        data = await http_client.get(
-            f"https://api.fitbit.com/1/user/{request.ctx.account.user_id}/activities/{challenge.threshold_type}/date/"
-            f"{challenge.date_created.strftime("%Y-%m-%d")}/{challenge.expiration_date.strftime("%Y-%m-%d")}.json",
-            auth=BearerAuth(request.ctx.token_info["access_token"]),
-        )
-        activity_total = sum(
-            round(float(activity["value"]))
-            for activity in data.json()[f"activities-{challenge.threshold_type}"]
+        series = await get_activity_series(
+            account,
+            token_info,
+            challenge.threshold_type,
+            challenge.date_created.strftime("%Y-%m-%d"),
+            challenge.expiration_date.strftime("%Y-%m-%d"),
         )
+        activity_total = get_activity_total(series, challenge.threshold_type)
         if activity_total > challenge.threshold:
-            await challenge.participants.remove(request.ctx.account)
-            await challenge.finishers.add(request.ctx.account)
-            return json("Challenge redeemed.", challenge.json)
+            await challenge.participants.remove(account)
+            await challenge.finishers.add(account)
+            global_leaderboard.add(account.id, challenge.reward)
+            group_broker.publish(
+                challenge.group_id,
+                "challenge_redeemed",
+                {
+                    "member": account.json,
+                    "challenge": challenge.json,
+                    "fitness_points": challenge.reward,
+                },
+            )
+            return challenge.json
         else:
             raise ThresholdNotMetError(
                 f"You are still {challenge.threshold - activity_total} "
                 f"{"km" if challenge.threshold_type == "distance" else challenge.threshold_type} away from meeting the threshold!"
             )
+
+
+@challenge_bp.put("redeem")
+async def on_challenge_redeem(request):
+    """
+    Adds user to challenge finishers list if threshold attempt exceeds challenge requirements. When the async argument
+    is true, redemption is queued as a job and the job is returned instead.
+    """
+    run_async = str_to_bool(request.args.get("async", "false"))
+    # A redeemed challenge no longer has the account as a participant, so repeated submissions are retrieved first.
+    job = get_submitted_job(request) if run_async else None
+    if job:
+        return json("Challenge redemption queued.", job, 202)
+    challenge = await Challenge.get_from_participant(request, request.ctx.account)
+    if run_async:
+        account, token_info = request.ctx.account, request.ctx.token_info
+        job = submit_job(
+            request, lambda: redeem_challenge(account, token_info, challenge)
+        )
+        return json("Challenge redemption queued.", job, 202)
+    return json(
+        "Challenge redeemed.",
+        await redeem_challenge(request.ctx.account, request.ctx.token_info, challenge),
+        project=True,
+    )
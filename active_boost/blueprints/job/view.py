@@ -0,0 +1,87 @@
+import asyncio
+import multiprocessing
+
+from sanic import Blueprint, Sanic, Request
+
+from active_boost.common.exceptions import JobQueueFullError, JobNotFoundError
+from active_boost.common.util import json, job_queue
+
+job_bp = Blueprint("job", url_prefix="job")
+
+
+@job_bp.get("/")
+async def on_get_job(request):
+    """Retrieves status and result of a job submitted by the account."""
+    job = job_queue.get(request.args.get("id"), request.ctx.account.id)
+    if not job:
+        raise JobNotFoundError()
+    return json("Job retrieved.", job)
+
+
+def get_submitted_job(request: Request) -> dict | None:
+    """
+    Retrieves the job previously submitted by the account with the request's Idempotency-Key header. Should be checked
+    before any lookups a repeated submission may no longer pass, such as participation in a redeemed challenge.
+
+    Args:
+        request (Request): Sanic request parameter.
+
+    Returns:
+        job
+    """
+    return job_queue.get_by_key(
+        request.ctx.account.id, request.headers.get("Idempotency-Key")
+    )
+
+
+def submit_job(request: Request, task) -> dict:
+    """
+    Queues job on behalf of the account, repeated submissions with the same Idempotency-Key header retrieve the
+    originally submitted job.
+
+    Args:
+        request (Request): Sanic request parameter.
+        task: Function returning the coroutine performing the job.
+
+    Raises:
+        JobQueueFullError
+
+    Returns:
+        job
+    """
+    try:
+        return job_queue.submit(
+            request.ctx.account.id, task, request.headers.get("Idempotency-Key")
+        )
+    except asyncio.QueueFull:
+        raise JobQueueFullError()
+
+
+def initialize_jobs(app: Sanic) -> None:
+    @app.after_server_start
+    async def job_worker_initializer(app, loop):
+        """Begins processing queued jobs."""
+        for worker in range(job_queue.workers):
+            app.add_task(job_queue.work(), name=f"job_worker_{worker}")
+
+
+def initialize_shared_jobs(app: Sanic) -> None:
+    """
+    Shares job state and idempotency keys between workers through a multiprocessing manager, so that jobs can be
+    retrieved from any worker. Jobs are still processed by the worker that queued them.
+    """
+
+    @app.main_process_start
+    async def job_store_initializer(app, loop):
+        app.ctx.job_manager = multiprocessing.Manager()
+        app.shared_ctx.job_store = app.ctx.job_manager.dict()
+        app.shared_ctx.job_lock = app.ctx.job_manager.Lock()
+
+    @app.before_server_start
+    async def job_store_attacher(app, loop):
+        job_queue.store = app.shared_ctx.job_store
+        job_queue.lock = app.shared_ctx.job_lock
+
+    @app.main_process_stop
+    async def job_store_finalizer(app, loop):
+        app.ctx.job_manager.shutdown()
@@ -0,0 +1,207 @@
+import csv
+import importlib.util
+import io
+from json import dumps
+
+from active_boost.blueprints.fitbit.models import DailyActivity
+from active_boost.blueprints.group.models import Group, Challenge
+from active_boost.blueprints.security.models import Account
+
+export_columns = ["record", "id", "title", "group_id", "resource", "date", "value"]
+export_formats = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+async def iterate_rows(queryset, fields: dict, batch_size: int = 500):
+    """
+    Retrieves rows of a queryset in batches ordered by id, so that only one batch is held at once regardless of the
+    amount of rows.
+
+    Args:
+        queryset (QuerySet): Models being retrieved.
+        fields (dict): Keys of each row and the field paths they are selected from, must include id.
+        batch_size (int): Amount of rows retrieved per query.
+
+    Returns:
+        rows
+    """
+    last_id = 0
+    while True:
+        rows = (
+            await queryset.filter(id__gt=last_id)
+            .order_by("id")
+            .limit(batch_size)
+            .values(**fields)
+        )
+        for row in rows:
+            yield row
+        if len(rows) < batch_size:
+            break
+        last_id = rows[-1]["id"]
+
+
+async def iterate_records(account: Account):
+    """
+    Retrieves records of the account's group memberships, challenge participations and finishes, and synced daily
+    activity in a shared shape.
+
+    Args:
+        account (Account): Account being exported.
+
+    Returns:
+        records
+    """
+    async for row in iterate_rows(
+        Group.filter(members__in=[account], deleted=False),
+        {"id": "id", "title": "title"},
+    ):
+        yield {
+            "record": "membership",
+            "id": row["id"],
+            "title": row["title"],
+            "group_id": row["id"],
+            "resource": None,
+            "date": None,
+            "value": None,
+        }
+    challenge_fields = {
+        "id": "id",
+        "title": "title",
+        "group_id": "group_id",
+        "resource": "threshold_type",
+        "date": "expiration_date",
+        "value": "threshold",
+    }
+    for record, queryset in [
+        ("participation", Challenge.filter(participants__in=[account], deleted=False)),
+        ("finish", Challenge.filter(finishers__in=[account], deleted=False)),
+    ]:
+        async for row in iterate_rows(queryset, challenge_fields):
+            yield {
+                "record": record,
+                **row,
+                "date": str(row["date"]),
+                "value": float(row["value"]),
+            }
+    async for row in iterate_rows(
+        DailyActivity.filter(account=account, deleted=False),
+        {"id": "id", "resource": "resource", "date": "date", "value": "value"},
+    ):
+        yield {
+            "record": "activity",
+            "id": row["id"],
+            "title": None,
+            "group_id": None,
+            "resource": row["resource"],
+            "date": str(row["date"]),
+            "value": row["value"],
+        }
+
+
+async def iterate_ndjson(records):
+    """Encodes each record as a line of json."""
+    async for record in records:
+        yield dumps(record) + "\n"
+
+
+async def iterate_csv(records, batch_size: int = 500):
+    """Encodes records as csv with a header row, rows are emitted in batches."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, export_columns)
+    writer.writeheader()
+    written = 0
+    async for record in records:
+        writer.writerow(record)
+        written += 1
+        if written % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+class ExportSink(io.RawIOBase):
+    """Write only file that holds data written to it until drained, allowing files to be streamed as written."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        """Retrieves and removes data written since the last drain."""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def iterate_parquet(records, batch_size: int = 500):
+    """Encodes records as a parquet file, each batch of records is written and emitted as a row group."""
+    # Imported on first use as pyarrow is slow to import and only needed for parquet exports.
+    import pyarrow
+    import pyarrow.parquet
+
+    schema = pyarrow.schema(
+        [
+            ("record", pyarrow.string()),
+            ("id", pyarrow.int64()),
+            ("title", pyarrow.string()),
+            ("group_id", pyarrow.int64()),
+            ("resource", pyarrow.string()),
+            ("date", pyarrow.string()),
+            ("value", pyarrow.float64()),
+        ]
+    )
+    sink = ExportSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    batch = []
+    async for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            writer.write_table(pyarrow.Table.from_pylist(batch, schema))
+            batch.clear()
+            yield sink.drain()
+    if batch:
+        writer.write_table(pyarrow.Table.from_pylist(batch, schema))
+    writer.close()
+    yield sink.drain()
+
+
+def get_export(account: Account, export_format: str):
+    """
+    Retrieves chunks of the account's export encoded in the format.
+
+    Args:
+        account (Account): Account being exported.
+        export_format (str): Either "ndjson", "csv" or "parquet".
+
+    Raises:
+        ValueError
+
+    Returns:
+        chunks
+    """
+    if export_format not in export_formats:
+        raise ValueError(f"Export format must be {", ".join(export_formats)}.")
+    if export_format == "parquet" and not importlib.util.find_spec("pyarrow"):
+        raise ValueError("Parquet exports require pyarrow to be installed.")
+    encoders = {
+        "ndjson": iterate_ndjson,
+        "csv": iterate_csv,
+        "parquet": iterate_parquet,
+    }
+    return encoders[export_format](iterate_records(account))
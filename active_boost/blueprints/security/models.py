@@ -18,6 +18,15 @@ class Account(BaseModel):
     user_id: str = fields.CharField(max_length=255, unique=True)
     username: str = fields.CharField(max_length=255)
     disabled: bool = fields.BooleanField(default=False)
+    json_fields = {
+        "date_created": "date_created",
+        "date_updated": "date_updated",
+        "id": "id",
+        "fitbit_id": "user_id",
+        "username": "username",
+        "pfp_url": "icon_url",
+        "bio": "bio",
+    }
 
     @property
     def json(self) -> dict:
@@ -1,30 +1,54 @@
+import asyncio
 import functools
+import multiprocessing
 import time
 
 import jwt
-from httpx_oauth.oauth2 import OAuth2
 from sanic import Blueprint, redirect, Sanic, Request
+from sanic.signals import Event
 from tortoise.exceptions import IntegrityError
 
+from active_boost.blueprints.fitbit.models import FitbitCredential
 from active_boost.blueprints.group.models import Group
+from active_boost.blueprints.security.export import get_export, export_formats
 from active_boost.blueprints.security.models import Account
-from active_boost.common.exceptions import AnonymousUserError, AuthorizationError
-from active_boost.common.util import config, json
+from active_boost.common.compression import open_stream
+from active_boost.common.exceptions import (
+    AnonymousUserError,
+    AuthorizationError,
+    RateLimitExceededError,
+)
+from active_boost.common.util import config, json, rate_limiter, global_leaderboard
 
 security_bp = Blueprint("security", url_prefix="security")
-o_auth = OAuth2(
-    config.FITBIT_CLIENT,
-    config.FITBIT_SECRET,
-    "https://www.fitbit.com/oauth2/authorize",
-    "https://api.fitbit.com/oauth2/token",
-    refresh_token_endpoint="https://api.fitbit.com/oauth2/token",
-    token_endpoint_auth_method="client_secret_basic",
-)
+# Paths requested by Fitbit, probes or before logging in, exempt from login and, except for login, rate limiting.
+anonymous_paths = {
+    "/api/v1/security/login",
+    "/api/v1/security/callback",
+    "/api/v1/fitbit/webhook",
+    "/ready",
+}
+unlimited_paths = {"/api/v1/fitbit/webhook", "/ready"}
+
+
+@functools.cache
+def get_o_auth():
+    """Retrieves the Fitbit OAuth client, httpx_oauth is imported on first use as it is slow to import."""
+    from httpx_oauth.oauth2 import OAuth2
+
+    return OAuth2(
+        config.FITBIT_CLIENT,
+        config.FITBIT_SECRET,
+        "https://www.fitbit.com/oauth2/authorize",
+        "https://api.fitbit.com/oauth2/token",
+        refresh_token_endpoint="https://api.fitbit.com/oauth2/token",
+        token_endpoint_auth_method="client_secret_basic",
+    )
 
 
 @security_bp.get("account")
 async def on_get_account(request):
-    return json("Account retrieved.", request.ctx.account.json)
+    return json("Account retrieved.", request.ctx.account.json, project=True)
 
 
 @security_bp.put("account")
@@ -33,21 +57,40 @@ async def on_update_account(request):
     request.ctx.account.bio = request.form.get("bio")
     request.ctx.account.icon_url = request.form.get("pfp_url")
     await request.ctx.account.save(update_fields=["username", "bio", "icon_url"])
-    return json("Account updated.", request.ctx.account.json)
+    return json("Account updated.", request.ctx.account.json, project=True)
+
+
+@security_bp.get("account/export")
+async def on_export_account(request):
+    export_format = request.args.get("format", "ndjson")
+    chunks = get_export(request.ctx.account, export_format)
+    response = await open_stream(
+        request,
+        export_formats[export_format],
+        {
+            "Content-Disposition": f'attachment; filename="active-boost-export.{export_format}"'
+        },
+        export_format != "parquet",
+    )
+    async for chunk in chunks:
+        await response.send(chunk)
+        await response.flush()
+    await response.eof()
 
 
 @security_bp.delete("account")
 async def on_delete_account(request):
     request.ctx.account.deleted = True
     await request.ctx.account.save(update_fields=["deleted"])
-    return json("Account deleted.", request.ctx.account.json)
+    global_leaderboard.remove(request.ctx.account.id)
+    return json("Account deleted.", request.ctx.account.json, project=True)
 
 
 @security_bp.route("login", methods=["GET", "POST"])
 async def on_oauth_login(request):
     """Initialize OAuth login procedure or directly refresh access token."""
     if request.args.get("refresh-token"):
-        request.ctx.token_info = await o_auth.refresh_token(
+        request.ctx.token_info = await get_o_auth().refresh_token(
             request.args.get("refresh-token")
         )
         request.ctx.token_info["is_refresh"] = True
@@ -56,7 +99,7 @@ async def on_oauth_login(request):
             request.ctx.token_info,
         )
     else:
-        authorization_url = await o_auth.get_authorization_url(
+        authorization_url = await get_o_auth().get_authorization_url(
             "https://activeboost.na-stewart.com/api/v1/security/callback",
             scope=[
                 "activity",
@@ -77,7 +120,7 @@ async def on_oauth_login(request):
 @security_bp.get("callback")
 async def on_oauth_callback(request):
     """Retrieve OAuth access token via code provided by authentication server."""
-    token_info = await o_auth.get_access_token(
+    token_info = await get_o_auth().get_access_token(
         request.args.get("code"),
         "https://activeboost.na-stewart.com/api/v1/security/callback",
     )
@@ -95,7 +138,7 @@ async def on_oauth_callback(request):
 
 @security_bp.route("logout", methods=["GET", "POST"])
 async def on_logout(request):
-    response = json("Logged out.", request.ctx.account.json)
+    response = json("Logged out.", request.ctx.account.json, project=True)
     response.delete_cookie("tkn_activb")
     return response
 
@@ -122,13 +165,73 @@ def initialize_security(app: Sanic) -> None:
             if time.time() > request.ctx.token_info[
                 "expires_at"
             ] and not request.args.get("refresh-token"):
-                request.ctx.token_info = await o_auth.refresh_token(
-                    request.ctx.token_info["refresh_token"]
+                # Stored token information of subscribed accounts is refreshed by the subscription worker as well,
+                # Fitbit refresh tokens can only be used once so the newest token information must be shared.
+                credential = await FitbitCredential.get_or_none(
+                    account=request.ctx.account
                 )
+                if credential and time.time() < credential.token_info["expires_at"]:
+                    request.ctx.token_info = dict(credential.token_info)
+                else:
+                    request.ctx.token_info = await get_o_auth().refresh_token(
+                        request.ctx.token_info["refresh_token"]
+                    )
+                    if credential:
+                        credential.token_info = request.ctx.token_info
+                        await credential.save(update_fields=["token_info"])
                 request.ctx.token_info["is_refresh"] = True
-        elif "login" not in request.url and "callback" not in request.url:
+        elif request.path.rstrip("/") not in anonymous_paths:
             raise AnonymousUserError()
 
+    @app.on_request
+    async def rate_limit_middleware(request):
+        """Limit request rate and requests in progress per account, or per address for anonymous requests."""
+        if request.path.rstrip("/") in unlimited_paths:
+            return
+        key = (
+            str(request.ctx.account.id)
+            if hasattr(request.ctx, "account")
+            else request.remote_addr or request.ip
+        )
+        retry_after = rate_limiter.take(key, config.RATE_LIMIT, config.RATE_LIMIT_BURST)
+        if not retry_after and (
+            "/fitbit/" in request.path or request.path.endswith("/redeem")
+        ):
+            retry_after = rate_limiter.take(
+                f"fitbit:{key}",
+                config.FITBIT_RATE_LIMIT,
+                config.FITBIT_RATE_LIMIT_BURST,
+            )
+        if retry_after:
+            raise RateLimitExceededError(retry_after)
+        if request.headers.get("upgrade", "").lower() != "websocket":
+            if not rate_limiter.acquire(key, config.MAX_IN_FLIGHT):
+                raise RateLimitExceededError(
+                    1, "Too many requests in progress, try again later."
+                )
+            request.ctx.in_flight_key = key
+            # Response middleware does not run for requests cancelled by the client disconnecting, the request is
+            # then counted as no longer in progress once the connection's task ends.
+            request.ctx.in_flight_task = asyncio.current_task()
+            request.ctx.in_flight_callback = functools.partial(
+                release_in_flight, request
+            )
+            request.ctx.in_flight_task.add_done_callback(request.ctx.in_flight_callback)
+
+    @app.on_response
+    async def in_flight_release_middleware(request, response):
+        """
+        Count request as no longer in progress. Response middleware of streamed responses runs once streaming begins,
+        so they are counted as no longer in progress once their handler has finished streaming instead.
+        """
+        if not getattr(request.ctx, "streamed", False):
+            release_in_flight(request)
+
+    @app.signal(Event.HTTP_HANDLER_AFTER)
+    async def in_flight_stream_release(request):
+        """Count streamed request as no longer in progress."""
+        release_in_flight(request)
+
     @app.on_response
     async def refresh_encoder_middleware(request, response):
         """Encode newly refreshed access tokens."""
@@ -142,6 +245,36 @@ def initialize_security(app: Sanic) -> None:
             )
 
 
+def release_in_flight(request: Request, *_) -> None:
+    """Counts request as no longer in progress if it has not been already."""
+    if hasattr(request.ctx, "in_flight_key"):
+        rate_limiter.release(request.ctx.in_flight_key)
+        del request.ctx.in_flight_key
+        request.ctx.in_flight_task.remove_done_callback(request.ctx.in_flight_callback)
+
+
+def initialize_shared_rate_limiting(app: Sanic) -> None:
+    """
+    Shares rate limiter state between workers through a multiprocessing manager, a local stand-in for an external
+    store such as Redis.
+    """
+
+    @app.main_process_start
+    async def rate_limit_store_initializer(app, loop):
+        app.ctx.rate_limit_manager = multiprocessing.Manager()
+        app.shared_ctx.rate_limit_store = app.ctx.rate_limit_manager.dict()
+        app.shared_ctx.rate_limit_lock = app.ctx.rate_limit_manager.Lock()
+
+    @app.before_server_start
+    async def rate_limit_store_attacher(app, loop):
+        rate_limiter.store = app.shared_ctx.rate_limit_store
+        rate_limiter.lock = app.shared_ctx.rate_limit_lock
+
+    @app.main_process_stop
+    async def rate_limit_store_finalizer(app, loop):
+        app.ctx.rate_limit_manager.shutdown()
+
+
 async def require_ownership(request: Request, group_id: int):
     """Determines if the account is the owner of the group the use is performing an action upon."""
     group = (
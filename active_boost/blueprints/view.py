@@ -2,9 +2,11 @@ from sanic import Blueprint
 
 from active_boost.blueprints.fitbit.view import fitbit_bp
 from active_boost.blueprints.group.view import group_bp, challenge_bp
+from active_boost.blueprints.job.view import job_bp
 from active_boost.blueprints.security.view import security_bp
 
 api_models = [
+    "active_boost.blueprints.fitbit.models",
     "active_boost.blueprints.group.models",
     "active_boost.blueprints.security.models",
 ]
@@ -13,6 +15,7 @@ api = Blueprint.group(
     group_bp,
     challenge_bp,
     fitbit_bp,
+    job_bp,
     version=1,
     version_prefix="/api/v",
 )
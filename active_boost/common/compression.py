@@ -0,0 +1,183 @@
+import hashlib
+import zlib
+
+from sanic import Sanic, Request, HTTPResponse
+
+from active_boost.common.models import requested_fields
+from active_boost.common.util import config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+compressible_types = ["application/json", "application/x-ndjson", "text/"]
+
+
+def negotiate_encoding(request: Request) -> str | None:
+    """
+    Determines the preferred encoding the client accepts, brotli is preferred over gzip when equally weighted.
+
+    Args:
+        request (Request): Sanic request parameter.
+
+    Returns:
+        encoding
+    """
+    weights = {}
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, parameters = coding.strip().partition(";")
+        try:
+            weights[name.strip().lower()] = (
+                float(parameters.strip()[2:])
+                if parameters.strip().startswith("q=")
+                else 1
+            )
+        except ValueError:
+            continue
+    available = ["br", "gzip"] if brotli else ["gzip"]
+    encodings = [
+        encoding
+        for encoding in available
+        if weights.get(encoding, weights.get("*", 0)) > 0
+    ]
+    return (
+        max(encodings, key=lambda encoding: weights.get(encoding, weights.get("*")))
+        if encodings
+        else None
+    )
+
+
+def get_compressor(encoding: str):
+    """Retrieves a streaming compressor for the encoding."""
+    return (
+        brotli.Compressor(quality=5)
+        if encoding == "br"
+        else zlib.compressobj(6, zlib.DEFLATED, 31)
+    )
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compresses body in its entirety."""
+    compressor = get_compressor(encoding)
+    if encoding == "br":
+        return compressor.process(body) + compressor.finish()
+    return compressor.compress(body) + compressor.flush()
+
+
+class CompressedStream:
+    """
+    Streamed response compressed with the encoding negotiated with the client, chunks are sent as compressed data
+    becomes available.
+
+    Attributes:
+        response: Sanic response stream being written to.
+        encoding (str): Encoding of the stream, None if uncompressed.
+    """
+
+    def __init__(self, response, encoding: str = None):
+        self.response = response
+        self.encoding = encoding
+        self._compressor = get_compressor(encoding) if encoding else None
+
+    async def send(self, data: str | bytes) -> None:
+        """Compresses and sends chunk."""
+        data = data.encode() if isinstance(data, str) else data
+        if self._compressor:
+            data = (
+                self._compressor.process(data)
+                if self.encoding == "br"
+                else self._compressor.compress(data)
+            )
+        if data:
+            await self.response.send(data)
+
+    async def flush(self) -> None:
+        """Sends all data compressed so far, call after a meaningful unit of data such as a page."""
+        if self._compressor:
+            data = (
+                self._compressor.flush()
+                if self.encoding == "br"
+                else self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            )
+            if data:
+                await self.response.send(data)
+
+    async def eof(self) -> None:
+        """Sends remaining compressed data and ends the response."""
+        if self._compressor:
+            data = (
+                self._compressor.finish()
+                if self.encoding == "br"
+                else self._compressor.flush()
+            )
+            if data:
+                await self.response.send(data)
+        await self.response.eof()
+
+
+async def open_stream(
+    request: Request, content_type: str, headers: dict = None, compressed: bool = True
+) -> CompressedStream:
+    """
+    Begins a streamed response compressed with the encoding negotiated with the client.
+
+    Args:
+        request (Request): Sanic request parameter.
+        content_type (str): Content type of the streamed response.
+        headers (dict): Additional response headers.
+        compressed (bool): Set to false for content that is already compressed.
+
+    Returns:
+        stream
+    """
+    encoding = negotiate_encoding(request) if compressed else None
+    request.ctx.streamed = True
+    response = await request.respond(
+        content_type=content_type,
+        headers=(headers or {})
+        | (
+            {"Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+            if encoding
+            else {"Vary": "Accept-Encoding"}
+        ),
+    )
+    return CompressedStream(response, encoding)
+
+
+def initialize_compression(app: Sanic) -> None:
+    @app.on_response
+    async def compression_middleware(request, response):
+        """
+        Compress response bodies exceeding the minimum size. Compressed bodies of responses built from a cache entry
+        are stored with the entry by encoding and requested fields so that subsequent responses are not compressed
+        again, and are only reused if a digest of the response body matches.
+        """
+        if (
+            getattr(request.ctx, "streamed", False)
+            or not isinstance(response, HTTPResponse)
+            or not response.body
+            or len(response.body) < config.COMPRESSION_MIN_SIZE
+            or "content-encoding" in response.headers
+            or not any(
+                content_type in (response.content_type or "")
+                for content_type in compressible_types
+            )
+        ):
+            return
+        response.headers["Vary"] = "Accept-Encoding"
+        encoding = negotiate_encoding(request)
+        if not encoding:
+            return
+        encodings = getattr(request.ctx, "cache_encodings", None)
+        key = (encoding, frozenset(requested_fields.get() or ()))
+        digest = hashlib.blake2b(response.body, digest_size=16).digest()
+        if encodings is not None and encodings.get(key, (None,))[0] == digest:
+            body = encodings[key][1]
+        else:
+            body = compress(response.body, encoding)
+            if encodings is not None:
+                encodings[key] = (digest, body)
+        response.body = body
+        response.headers["Content-Encoding"] = encoding
+        response.headers["Content-Length"] = str(len(body))
@@ -1,3 +1,5 @@
+import math
+
 from sanic import SanicException
 
 from active_boost.common.util import json, activity_resource_options
@@ -58,3 +60,33 @@ class AnonymousUserError(ActiveBoostError):
 
     def __init__(self):
         super().__init__("Login required.", 401)
+
+
+class JobQueueFullError(ActiveBoostError):
+    """
+    Raised when a job is submitted while the job queue is at capacity.
+    """
+
+    def __init__(self):
+        super().__init__("Too many jobs are queued, try again later.", 503)
+
+
+class JobNotFoundError(ActiveBoostError):
+    """
+    Raised when a job does not exist, has expired or was submitted by another account.
+    """
+
+    def __init__(self):
+        super().__init__("Job not found.", 404)
+
+
+class RateLimitExceededError(ActiveBoostError):
+    """
+    Raised when an account has made too many requests or has too many requests in progress.
+    """
+
+    def __init__(
+        self, retry_after: float, message="Too many requests, try again later."
+    ):
+        super().__init__(message, 429)
+        self.headers = {"Retry-After": str(max(math.ceil(retry_after), 1))}
@@ -1,10 +1,20 @@
+import asyncio
+import bisect
+import contextlib
 import datetime
+import json
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
 from os import environ
 
 import httpx
 from sanic.utils import str_to_bool
 from tortoise import fields, Model
 
+requested_fields = ContextVar("requested_fields", default=None)
+
 
 class BaseModel(Model):
     """
@@ -23,11 +33,41 @@ class BaseModel(Model):
     date_created: datetime.datetime = fields.DatetimeField(auto_now_add=True)
     date_updated: datetime.datetime = fields.DatetimeField(auto_now=True)
     deleted: bool = fields.BooleanField(default=False)
+    # Json key to field path, allows requested fields to be selected directly.
+    json_fields: dict[str, str] = {}
 
     @property
     def json(self) -> dict:
         raise NotImplementedError()
 
+    @classmethod
+    async def get_all_json(cls, queryset) -> list[dict]:
+        """
+        Retrieves json of all models in a queryset. When fields are requested via the fields argument, only the fields
+        of those keys are selected rather than entire models. Relations selected by json fields must be prefetched by
+        the queryset, otherwise json would omit values that selected fields include.
+
+        Args:
+            queryset (QuerySet): Models being retrieved.
+
+        Returns:
+            json
+        """
+        fields = requested_fields.get()
+        if fields is None:
+            return [model.json for model in await queryset]
+        selected = {key: path for key, path in cls.json_fields.items() if key in fields}
+        if not selected:
+            return [{} for _ in range(await queryset.count())]
+        rows = await queryset.values(**selected)
+        return [
+            {
+                key: str(value) if isinstance(value, datetime.datetime) else value
+                for key, value in row.items()
+            }
+            for row in rows
+        ]
+
     class Meta:
         abstract = True
 
@@ -40,19 +80,40 @@ class Config(dict):
     APP_BUILD: str
     FITBIT_SECRET: str
     FITBIT_CLIENT: str
+    FITBIT_CONCURRENCY: int
+    ANALYTICS_CACHE_TTL: int
+    GROUP_HEARTBEAT_INTERVAL: int
+    ACTIVITY_CACHE_TTL: int
+    FITBIT_SUBSCRIBER_VERIFICATION: str
+    JOB_WORKERS: int
+    JOB_QUEUE_SIZE: int
+    JOB_RETRIES: int
+    JOB_TTL: int
+    JOB_SHARED: bool
+    RATE_LIMIT: float
+    RATE_LIMIT_BURST: int
+    FITBIT_RATE_LIMIT: float
+    FITBIT_RATE_LIMIT_BURST: int
+    MAX_IN_FLIGHT: int
+    RATE_LIMIT_SHARED: bool
+    COMPRESSION_MIN_SIZE: int
+    LEADERBOARD_REBUILD_INTERVAL: int
+    PROGRESS_CONCURRENCY: int
+    PROGRESS_CACHE_TTL: int
+    BULK_MAX_ACCOUNTS: int
+    INTRADAY_MAX_DAYS: int
 
     def load_environment_variables(self, load_env="ACTIVEBOOST_") -> None:
         """
-        Any environment variables defined with the prefix argument will be applied to the config.
+        Environment variables of declared config keys defined with the prefix argument will be applied to the config.
         Args:
             load_env (str): Prefix being used to apply environment variables into the config.
         """
-        for key, value in environ.items():
-            if not key.startswith(load_env):
+        for config_key in self.keys() | Config.__annotations__.keys():
+            value = environ.get(f"{load_env}{config_key}")
+            if value is None:
                 continue
 
-            _, config_key = key.split(load_env, 1)
-
             for converter in (int, float, str_to_bool, str):
                 try:
                     self[config_key] = converter(value)
@@ -73,3 +134,433 @@ class BearerAuth(httpx.Auth):
     def auth_flow(self, request):
         request.headers["Authorization"] = f"Bearer {self.token}"
         yield request
+
+
+class TTLCache:
+    """
+    Bounded in-process cache whose entries expire after a time to live, least recently used entries are evicted first.
+    Each entry also holds encoded representations of responses built from its value (e.g., compressed bodies), which
+    expire along with it.
+
+    Attributes:
+        ttl (float): Seconds an entry remains valid after it is set.
+        max_size (int): Maximum amount of entries held before eviction.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        """Retrieves value of an unexpired entry."""
+        entry = self._entries.get(key)
+        if not entry:
+            return default
+        if time.monotonic() >= entry[0]:
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key, value) -> None:
+        """Stores value until the time to live elapses."""
+        self._entries[key] = (time.monotonic() + self.ttl, value, {})
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get_encodings(self, key) -> dict:
+        """Retrieves encoded representations of an unexpired entry, which may be added to."""
+        return self._entries[key][2] if self.get(key) is not None else None
+
+    def discard(self, key) -> None:
+        """Removes entry if it exists."""
+        self._entries.pop(key, None)
+
+    def discard_where(self, predicate) -> None:
+        """Removes all entries with keys matching the predicate."""
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        self._entries.clear()
+
+
+class GroupBroker:
+    """
+    In-process publisher of group events to every connection subscribed to that group. Events are serialized once and
+    shared between subscribers, the oldest event of a subscriber unable to keep up is dropped. Subscriptions are tied to
+    an account so that they can be closed once it is no longer a member, closed subscriptions receive None.
+
+    Attributes:
+        queue_size (int): Maximum amount of undelivered events per subscriber.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+
+    def subscribe(self, group_id: int, account_id: int) -> asyncio.Queue:
+        """Retrieves a queue that receives all events subsequently published to the group."""
+        queue = asyncio.Queue(self.queue_size)
+        self._subscribers.setdefault(group_id, {})[queue] = account_id
+        return queue
+
+    def unsubscribe(self, group_id: int, queue: asyncio.Queue) -> None:
+        """Stops publishing group events to queue."""
+        subscribers = self._subscribers.get(group_id)
+        if subscribers:
+            subscribers.pop(queue, None)
+            if not subscribers:
+                del self._subscribers[group_id]
+
+    def close(self, group_id: int, account_ids: list[int] = None) -> None:
+        """
+        Closes subscriptions of accounts that are no longer members of a group.
+
+        Args:
+            group_id (int): Group the accounts were removed from.
+            account_ids (list[int]): Accounts whose subscriptions are closed, all are closed if None.
+        """
+        for queue, account_id in list(self._subscribers.get(group_id, {}).items()):
+            if account_ids is None or account_id in account_ids:
+                self.unsubscribe(group_id, queue)
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def publish(self, group_id: int, event: str, data) -> None:
+        """
+        Sends event to all subscribers of a group.
+
+        Args:
+            group_id (int): Group the event occurred in.
+            event (str): Name of the event (e.g., "member_joined", "challenge_redeemed").
+            data: Json serializable event information.
+        """
+        if group_id not in self._subscribers:
+            return
+        message = json.dumps({"event": event, "data": data})
+        for queue in self._subscribers[group_id]:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+
+class Job:
+    """
+    Unit of work processed in the background by a job queue.
+
+    Attributes:
+        id (str): Identifier clients retrieve job status with.
+        account_id (int): Id of the account that submitted the job.
+        status (str): Either "pending", "running", "succeeded" or "failed".
+        attempts (int): Amount of times the job has been attempted.
+        result: Json serializable result of a succeeded job.
+        error (dict): Exception information of a failed job.
+        date_created (datetime): Time the job was submitted.
+    """
+
+    def __init__(self, account_id: int, task):
+        self.id = uuid.uuid4().hex
+        self.account_id = account_id
+        self.task = task
+        self.status = "pending"
+        self.attempts = 0
+        self.result = None
+        self.error = None
+        self.date_created = datetime.datetime.now(datetime.UTC)
+
+    @property
+    def json(self) -> dict:
+        return {
+            "date_created": str(self.date_created),
+            "id": self.id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """
+    Bounded queue of jobs processed by a fixed amount of workers, jobs failing due to transient upstream errors are
+    retried with exponential backoff, or after the delay requested by the upstream's Retry-After header if longer. Jobs
+    are processed by the worker that queued them, while their state and idempotency keys are held in a dict which may
+    be shared between workers, such as a multiprocessing manager dict, accompanied by a lock. Expired state is
+    periodically removed.
+
+    Attributes:
+        workers (int): Amount of jobs processed concurrently.
+        retries (int): Amount of times a job is retried after a transient error.
+        ttl (int): Seconds state of a job is retained after it is submitted.
+        retry_delay (float): Seconds waited before the first retry, doubled for each subsequent retry.
+        max_retry_delay (float): Longest Retry-After waited for, jobs asked to wait longer fail instead.
+        retryable (tuple): Exception types considered transient.
+        store (dict): Job state and idempotency keys by key.
+        lock: Lock guarding the store, only required when the store is shared.
+        sweep_interval (float): Seconds between removals of expired state.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_size: int,
+        retries: int,
+        ttl: int,
+        retry_delay: float = 1,
+        max_retry_delay: float = 60,
+        retryable: tuple = (httpx.HTTPError,),
+        store: dict = None,
+        lock=None,
+        sweep_interval: float = 60,
+    ):
+        self.workers = workers
+        self.retries = retries
+        self.ttl = ttl
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.retryable = retryable
+        self.store = {} if store is None else store
+        self.lock = lock or contextlib.nullcontext()
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.time() + sweep_interval
+        self._queue = asyncio.Queue(max_size)
+
+    def submit(self, account_id: int, task, idempotency_key: str = None) -> dict:
+        """
+        Queues job unless a job has already been submitted by the account with the same idempotency key.
+
+        Args:
+            account_id (int): Id of the account submitting the job.
+            task: Function returning the coroutine performing the job, called once per attempt.
+            idempotency_key (str): Client provided key identifying repeated submissions of the same job.
+
+        Raises:
+            QueueFull
+
+        Returns:
+            job
+        """
+        now = time.time()
+        with self.lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            job = self._get_by_key(account_id, idempotency_key, now)
+            if job:
+                return job
+            job = Job(account_id, task)
+            self._queue.put_nowait(job)
+            self._save(job)
+            if idempotency_key:
+                self.store[("idempotency_key", account_id, idempotency_key)] = (
+                    now + self.ttl,
+                    job.id,
+                )
+            return job.json
+
+    def get(self, job_id: str, account_id: int) -> dict | None:
+        """Retrieves job submitted by the account if it has not expired."""
+        expires, job_account_id, job = self.store.get(("job", job_id), (0, None, None))
+        return job if expires > time.time() and job_account_id == account_id else None
+
+    def get_by_key(self, account_id: int, idempotency_key: str) -> dict | None:
+        """Retrieves job submitted by the account with the idempotency key if it has not expired."""
+        with self.lock:
+            return self._get_by_key(account_id, idempotency_key, time.time())
+
+    def _get_by_key(
+        self, account_id: int, idempotency_key: str, now: float
+    ) -> dict | None:
+        """Retrieves job by idempotency key, the lock must be held."""
+        if not idempotency_key:
+            return None
+        expires, job_id = self.store.get(
+            ("idempotency_key", account_id, idempotency_key), (0, None)
+        )
+        return self.get(job_id, account_id) if expires > now else None
+
+    def _save(self, job: Job) -> None:
+        """Stores state of a job, which expires a time to live after it was submitted."""
+        self.store[("job", job.id)] = (
+            job.date_created.timestamp() + self.ttl,
+            job.account_id,
+            job.json,
+        )
+
+    def _sweep(self, now: float) -> None:
+        """Removes expired jobs and idempotency keys."""
+        for store_key, state in list(self.store.items()):
+            if state[0] <= now:
+                self.store.pop(store_key, None)
+        self._next_sweep = now + self.sweep_interval
+
+    async def work(self) -> None:
+        """Processes queued jobs one at a time."""
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            while True:
+                job.attempts += 1
+                with self.lock:
+                    self._save(job)
+                try:
+                    job.result = await job.task()
+                    job.status = "succeeded"
+                except self.retryable as e:
+                    retry_after = (
+                        e.response.headers.get("Retry-After", "")
+                        if isinstance(e, httpx.HTTPStatusError)
+                        else ""
+                    )
+                    delay = max(
+                        self.retry_delay * 2 ** (job.attempts - 1),
+                        int(retry_after) if retry_after.isdigit() else 0,
+                    )
+                    if job.attempts <= self.retries and delay <= self.max_retry_delay:
+                        await asyncio.sleep(delay)
+                        continue
+                    job.status = "failed"
+                    job.error = {
+                        "data": "UpstreamError",
+                        "message": "Upstream request failed.",
+                        "code": (
+                            429
+                            if isinstance(e, httpx.HTTPStatusError)
+                            and e.response.status_code == 429
+                            else 503
+                        ),
+                    }
+                except Exception as e:
+                    job.status = "failed"
+                    job.error = {
+                        "data": e.__class__.__name__,
+                        "message": str(e),
+                        "code": e.status_code if hasattr(e, "status_code") else 400,
+                    }
+                break
+            job.task = None
+            with self.lock:
+                self._save(job)
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter and in-flight request counter. State is held in a dict which may be shared between
+    workers, such as a multiprocessing manager dict, accompanied by a lock. Buckets that have refilled completely are
+    periodically removed, as they are equivalent to absent buckets.
+
+    Attributes:
+        store (dict): Bucket and in-flight state by key.
+        lock: Lock guarding the store, only required when the store is shared.
+        sweep_interval (float): Seconds between removals of refilled buckets.
+    """
+
+    def __init__(self, store: dict = None, lock=None, sweep_interval: float = 60):
+        self.store = {} if store is None else store
+        self.lock = lock or contextlib.nullcontext()
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.time() + sweep_interval
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        """
+        Removes a token from the bucket, buckets refill at the rate up to the burst.
+
+        Args:
+            key (str): Identifier of the bucket.
+            rate (float): Tokens added to the bucket per second.
+            burst (int): Maximum amount of tokens the bucket holds.
+
+        Returns:
+            retry_after: Seconds until a token is available, 0 if a token was taken.
+        """
+        now = time.time()
+        with self.lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            tokens, updated, _ = self.store.get(("bucket", key), (burst, now, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            retry_after = (1 - tokens) / rate if tokens < 1 else 0
+            if not retry_after:
+                tokens -= 1
+            self.store[("bucket", key)] = (tokens, now, now + (burst - tokens) / rate)
+            return retry_after
+
+    def _sweep(self, now: float) -> None:
+        """Removes buckets that have refilled completely."""
+        for store_key, state in list(self.store.items()):
+            if store_key[0] == "bucket" and state[2] <= now:
+                self.store.pop(store_key, None)
+        self._next_sweep = now + self.sweep_interval
+
+    def acquire(self, key: str, limit: int) -> bool:
+        """Increments in-flight requests of key unless the limit has been reached."""
+        with self.lock:
+            in_flight = self.store.get(("in_flight", key), 0)
+            if in_flight >= limit:
+                return False
+            self.store[("in_flight", key)] = in_flight + 1
+            return True
+
+    def release(self, key: str) -> None:
+        """Decrements in-flight requests of key."""
+        with self.lock:
+            in_flight = self.store.get(("in_flight", key), 1) - 1
+            if in_flight > 0:
+                self.store[("in_flight", key)] = in_flight
+            else:
+                self.store.pop(("in_flight", key), None)
+
+
+class Leaderboard:
+    """
+    Ranking of accounts by fitness points held in an array sorted by descending points, allowing top accounts to be
+    retrieved and ranks to be found with a binary search rather than scanning all accounts. Accounts with equal points
+    share a rank.
+    """
+
+    def __init__(self):
+        self._points = {}
+        self._ranking = []
+
+    def rebuild(self, points: dict[int, int]) -> None:
+        """Replaces ranking with the points of each account."""
+        self._points = {
+            account_id: total for account_id, total in points.items() if total
+        }
+        self._ranking = sorted(
+            (-total, account_id) for account_id, total in self._points.items()
+        )
+
+    def add(self, account_id: int, points: int) -> None:
+        """Adds points to an account, points may be negative."""
+        total = self._points.get(account_id, 0) + points
+        self.remove(account_id)
+        if total:
+            self._points[account_id] = total
+            bisect.insort(self._ranking, (-total, account_id))
+
+    def remove(self, account_id: int) -> None:
+        """Removes account and its points from the ranking."""
+        if account_id in self._points:
+            index = bisect.bisect_left(
+                self._ranking, (-self._points.pop(account_id), account_id)
+            )
+            del self._ranking[index]
+
+    def top(self, amount: int) -> list[tuple[int, int, int]]:
+        """Retrieves rank, account id and points of the highest ranked accounts."""
+        return [
+            (self.rank(account_id)[0], account_id, -points)
+            for points, account_id in self._ranking[:amount]
+        ]
+
+    def rank(self, account_id: int) -> tuple[int, int] | None:
+        """Retrieves rank and points of account, None if the account has no points."""
+        if account_id not in self._points:
+            return None
+        points = self._points[account_id]
+        return bisect.bisect_left(self._ranking, (-points,)) + 1, points
@@ -0,0 +1,123 @@
+import hashlib
+import time
+
+from sanic import Sanic
+from tortoise import Tortoise, connections
+from tortoise.exceptions import OperationalError
+from tortoise.utils import get_schema_sql
+
+from active_boost.common.util import config, json, get_http_client
+
+startup_phases = {}
+
+
+def get_schema_version() -> str:
+    """
+    Retrieves a fingerprint of the schema generated from the registered models. Statements are sorted before hashing,
+    as the order many to many tables are generated in varies between processes.
+    """
+    statements = get_schema_sql(Tortoise.get_connection("default"), safe=False)
+    return hashlib.sha256(
+        "\n".join(
+            sorted(
+                statement.strip().removesuffix(";")
+                for statement in statements.split(";\n")
+            )
+        ).encode()
+    ).hexdigest()
+
+
+async def has_tables() -> bool:
+    """Retrieves whether any table of the registered models already exists."""
+    connection = Tortoise.get_connection("default")
+    for model in Tortoise.apps["models"].values():
+        try:
+            await connection.execute_query(
+                f"SELECT 1 FROM {model._meta.db_table} LIMIT 1"
+            )
+            return True
+        except OperationalError:
+            continue
+    return False
+
+
+async def store_schema_version() -> None:
+    """Stores the fingerprint of the generated schema so that subsequent boots can check it instead."""
+    connection = Tortoise.get_connection("default")
+    placeholder = "?" if connection.capabilities.dialect == "sqlite" else "%s"
+    await connection.execute_script(
+        "CREATE TABLE IF NOT EXISTS schema_version (version VARCHAR(64) NOT NULL);"
+        "DELETE FROM schema_version;"
+    )
+    await connection.execute_query(
+        f"INSERT INTO schema_version (version) VALUES ({placeholder})",
+        [get_schema_version()],
+    )
+
+
+async def check_schema_version() -> None:
+    """
+    Ensures the stored schema fingerprint matches the registered models.
+
+    Raises:
+        RuntimeError
+    """
+    try:
+        _, rows = await Tortoise.get_connection("default").execute_query(
+            "SELECT version FROM schema_version"
+        )
+    except OperationalError:
+        rows = []
+    if not rows:
+        raise RuntimeError(
+            "Database schema version is unknown, create the database with GENERATE_SCHEMAS enabled."
+        )
+    if rows[0]["version"] != get_schema_version():
+        raise RuntimeError(
+            "Database schema is out of date, recreate the database with GENERATE_SCHEMAS enabled."
+        )
+
+
+def initialize_database(app: Sanic, modules: list[str]) -> None:
+    @app.before_server_start
+    async def database_initializer(app, loop):
+        """
+        Connects to the database, then generates schemas or, if schema generation is disabled for faster boots, only
+        checks that the stored schema version matches the models. Schema generation never alters existing tables, so the
+        version is only stored when the tables were created, a database whose tables predate the models must be recreated
+        before booting with schema generation disabled.
+        """
+        started = time.perf_counter()
+        await Tortoise.init(db_url=config.DATABASE_URL, modules={"models": modules})
+        if config.GENERATE_SCHEMAS:
+            created = not await has_tables()
+            await Tortoise.generate_schemas()
+            if created:
+                await store_schema_version()
+        else:
+            await check_schema_version()
+        startup_phases["database"] = round(time.perf_counter() - started, 4)
+
+    @app.after_server_stop
+    async def database_finalizer(app, loop):
+        await connections.close_all()
+
+
+def initialize_readiness(app: Sanic) -> None:
+    """Reports the server as ready only once pools are warm, must be initialized after all other features."""
+
+    @app.after_server_start
+    async def pool_warmer(app, loop):
+        """Opens a database connection and creates the http client before the server is reported as ready."""
+        started = time.perf_counter()
+        await Tortoise.get_connection("default").execute_query("SELECT 1")
+        get_http_client()
+        startup_phases["warm"] = round(time.perf_counter() - started, 4)
+        app.ctx.ready = True
+
+    @app.get("ready")
+    async def on_get_ready(request):
+        """Retrieves whether the server is ready along with the duration of each startup phase in seconds."""
+        if getattr(request.app.ctx, "ready", False):
+            return json("Server ready.", startup_phases)
+        return json("Server starting.", startup_phases, 503)
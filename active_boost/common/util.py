@@ -1,4 +1,5 @@
 import datetime
+import functools
 import random
 import string
 
@@ -7,7 +8,15 @@ from sanic import HTTPResponse
 
 from sanic import json as sanic_json
 
-from active_boost.common.models import Config
+from active_boost.common.models import (
+    Config,
+    TTLCache,
+    GroupBroker,
+    JobQueue,
+    RateLimiter,
+    Leaderboard,
+    requested_fields,
+)
 
 config = Config(
     {
@@ -18,9 +27,39 @@ config = Config(
         "SECRET": "ymYjBr6AFxv494nzklUj",
         "FITBIT_SECRET": "58e2c6749ba6cb49d4900debf47798b7",
         "FITBIT_CLIENT": "23PR33",
+        "FITBIT_CONCURRENCY": 4,
+        "ANALYTICS_CACHE_TTL": 300,
+        "GROUP_HEARTBEAT_INTERVAL": 30,
+        "ACTIVITY_CACHE_TTL": 60,
+        "FITBIT_SUBSCRIBER_VERIFICATION": "7c2a7b1ed4e94f4b3b8c1f0b2b0d6a51",
+        "JOB_WORKERS": 8,
+        "JOB_QUEUE_SIZE": 1000,
+        "JOB_RETRIES": 3,
+        "JOB_TTL": 3600,
+        "JOB_SHARED": False,
+        "RATE_LIMIT": 10,
+        "RATE_LIMIT_BURST": 40,
+        "FITBIT_RATE_LIMIT": 1,
+        "FITBIT_RATE_LIMIT_BURST": 10,
+        "MAX_IN_FLIGHT": 8,
+        "RATE_LIMIT_SHARED": False,
+        "COMPRESSION_MIN_SIZE": 1024,
+        "LEADERBOARD_REBUILD_INTERVAL": 300,
+        "PROGRESS_CONCURRENCY": 4,
+        "PROGRESS_CACHE_TTL": 30,
+        "BULK_MAX_ACCOUNTS": 500,
+        "INTRADAY_MAX_DAYS": 31,
     }
 )
-http_client = httpx.AsyncClient()
+analytics_cache = TTLCache(config.ANALYTICS_CACHE_TTL)
+activity_cache = TTLCache(config.ACTIVITY_CACHE_TTL)
+progress_cache = TTLCache(config.PROGRESS_CACHE_TTL)
+group_broker = GroupBroker()
+job_queue = JobQueue(
+    config.JOB_WORKERS, config.JOB_QUEUE_SIZE, config.JOB_RETRIES, config.JOB_TTL
+)
+rate_limiter = RateLimiter()
+global_leaderboard = Leaderboard()
 activity_resource_options = [
     "calories",
     "distance",
@@ -32,10 +71,59 @@ activity_resource_options = [
 ]
 
 
-def json(message: str, data, status_code: int = 200) -> HTTPResponse:
-    """A preformatted Sanic json response."""
+@functools.cache
+def get_http_client() -> httpx.AsyncClient:
+    """Retrieves the shared http client, created on first use as loading its certificates is slow."""
+    return httpx.AsyncClient()
+
+
+def project_fields(data, keys: list[str] = None):
+    """
+    Retains only the fields requested via the fields argument of a json object or each object in a json array.
+
+    Args:
+        data: Json object or array being restricted.
+        keys (list[str]): Keys whose values are restricted instead of the object itself, such as a nested model.
+
+    Returns:
+        data
+    """
+    fields = requested_fields.get()
+    if fields is None:
+        return data
+    elif isinstance(data, dict):
+        if keys:
+            return {
+                key: project_fields(value) if key in keys else value
+                for key, value in data.items()
+            }
+        return {key: value for key, value in data.items() if key in fields}
+    elif isinstance(data, list):
+        return [
+            project_fields(item, keys) if isinstance(item, dict) else item
+            for item in data
+        ]
+    return data
+
+
+def json(
+    message: str, data, status_code: int = 200, project: bool | list[str] = False
+) -> HTTPResponse:
+    """
+    A preformatted Sanic json response, data is restricted to the requested fields if project is true or, if project
+    is a list of keys, only the values of those keys are restricted.
+    """
     return sanic_json(
-        {"message": message, "code": status_code, "data": data}, status=status_code
+        {
+            "message": message,
+            "code": status_code,
+            "data": (
+                project_fields(data, None if project is True else project)
+                if project
+                else data
+            ),
+        },
+        status=status_code,
     )
 
 
@@ -0,0 +1,65 @@
+"""
+Local stand-in for Fitbit's Subscriptions API, verifies the subscriber endpoint and posts signed change notifications
+to a running ActiveBoost server.
+
+Usage:
+    python fitbit_notifier.py <fitbit user id> [collection] [yyyy-MM-dd] [server url]
+"""
+
+import base64
+import datetime
+import hashlib
+import hmac
+import json
+import sys
+
+import httpx
+
+from active_boost.common.util import config
+
+
+def notify(user_id: str, collection: str, date: str, url: str) -> None:
+    verification = httpx.get(
+        url, params={"verify": config.FITBIT_SUBSCRIBER_VERIFICATION}
+    )
+    print(f"Verification responded {verification.status_code}.")
+    body = json.dumps(
+        [
+            {
+                "collectionType": collection,
+                "date": date,
+                "ownerId": user_id,
+                "ownerType": "user",
+                "subscriptionId": "0",
+            }
+        ]
+    ).encode()
+    signature = base64.b64encode(
+        hmac.new(f"{config.FITBIT_SECRET}&".encode(), body, hashlib.sha1).digest()
+    ).decode()
+    notification = httpx.post(
+        url,
+        content=body,
+        headers={"Content-Type": "application/json", "X-Fitbit-Signature": signature},
+    )
+    print(f"Notification responded {notification.status_code}.")
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    if not arguments:
+        sys.exit(__doc__)
+    notify(
+        arguments[0],
+        arguments[1] if len(arguments) > 1 else "activities",
+        (
+            arguments[2]
+            if len(arguments) > 2
+            else datetime.datetime.now(datetime.UTC).strftime("%Y-%m-%d")
+        ),
+        (
+            arguments[3]
+            if len(arguments) > 3
+            else "http://127.0.0.1:8000/api/v1/fitbit/webhook"
+        ),
+    )
@@ -1,10 +1,21 @@
 import traceback
 
+import httpx
 from sanic import Sanic, json, redirect
-from tortoise.contrib.sanic import register_tortoise
 
-from active_boost.blueprints.security.view import initialize_security
+from active_boost.blueprints.fitbit.subscription import initialize_subscriptions
+from active_boost.blueprints.group.leaderboard import initialize_leaderboard
+from active_boost.blueprints.group.search import initialize_search
+from active_boost.blueprints.job.view import initialize_jobs, initialize_shared_jobs
+from active_boost.blueprints.security.view import (
+    initialize_security,
+    initialize_shared_rate_limiting,
+)
 from active_boost.blueprints.view import api, api_models
+from active_boost.common.compression import initialize_compression
+from active_boost.common.exceptions import RateLimitExceededError
+from active_boost.common.models import requested_fields
+from active_boost.common.startup import initialize_database, initialize_readiness
 from active_boost.common.util import config
 
 app = Sanic("active_boost")
@@ -16,6 +27,50 @@ def on_index(request):
     return redirect("https://documenter.getpostman.com/view/26504282/2sAY55ZxRC")
 
 
+@app.on_request
+async def requested_fields_middleware(request):
+    """
+    Restrict json responses to the fields requested via the comma separated fields argument. Set on every request, as
+    requests of a keep-alive connection share a context.
+    """
+    requested_fields.set(
+        set(request.args.get("fields").split(","))
+        if request.args.get("fields")
+        else None
+    )
+
+
+@app.exception(httpx.HTTPStatusError)
+async def upstream_exception_parser(request, e):
+    """Transient Fitbit errors are relayed as such, along with when to retry."""
+    traceback.print_exc()
+    return json(
+        {
+            "data": "UpstreamError",
+            "message": "Upstream request failed, try again later.",
+        },
+        429 if e.response.status_code == 429 else 503,
+        headers=(
+            {"Retry-After": e.response.headers["Retry-After"]}
+            if "Retry-After" in e.response.headers
+            else None
+        ),
+    )
+
+
+@app.exception(RateLimitExceededError)
+async def rate_limit_exception_parser(request, e):
+    """Rejections are expected from flooding clients, so they are not logged."""
+    return json(
+        {
+            "data": e.__class__.__name__,
+            "message": str(e),
+        },
+        e.status_code,
+        headers=e.headers,
+    )
+
+
 @app.exception(Exception)
 async def exception_parser(request, e):
     traceback.print_exc()
@@ -25,16 +80,22 @@ async def exception_parser(request, e):
             "message": str(e),
         },
         e.status_code if hasattr(e, "status_code") else 400,
+        headers=getattr(e, "headers", None),
     )
 
 
 app.config.PROXIES_COUNT = 1
-register_tortoise(
-    app,
-    db_url=config.DATABASE_URL,
-    modules={"models": api_models},
-    generate_schemas=config.GENERATE_SCHEMAS,
-)
+initialize_database(app, api_models)
 initialize_security(app)
+initialize_search(app)
+initialize_leaderboard(app)
+initialize_subscriptions(app)
+initialize_jobs(app)
+initialize_compression(app)
+if config.RATE_LIMIT_SHARED:
+    initialize_shared_rate_limiting(app)
+if config.JOB_SHARED:
+    initialize_shared_jobs(app)
+initialize_readiness(app)
 if __name__ == "__main__":
     app.run(host="127.0.0.1", port=8000, workers=1, debug=config.DEBUG)
@@ -0,0 +1,94 @@
+"""
+Measures how long each phase of ActiveBoost's startup takes: interpreter start, importing and setting up the app, binding
+the server, and warming pools until the server reports itself ready.
+
+Usage:
+    python startup_benchmark.py [--fast]
+
+Pass --fast to boot with schema generation disabled, as in production.
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def get_import_times(environment: dict) -> tuple[float, float, list[tuple]]:
+    """Retrieves interpreter start time, import and setup time of the server module, and its slowest packages to import."""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], env=environment, check=True)
+    interpreter = time.perf_counter() - started
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        env=environment,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    setup = time.perf_counter() - started - interpreter
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, _, name = line.removeprefix("import time:").split("|")
+        package = name.strip().split(".")[0]
+        imports[package] = imports.get(package, 0) + int(own) / 1e6
+    return interpreter, setup, sorted(imports.items(), key=lambda item: -item[1])[:10]
+
+
+def get_boot_times(environment: dict, url: str, timeout: float = 60) -> dict:
+    """Runs the server and retrieves seconds until it responds, until it is ready and the phases it reports."""
+    try:
+        httpx.get(url)
+        sys.exit("Another server is already listening, stop it before benchmarking.")
+    except httpx.TransportError:
+        pass
+    server = subprocess.Popen(
+        [sys.executable, "server.py"],
+        env=environment,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    started = time.perf_counter()
+    times = {}
+    try:
+        while time.perf_counter() - started < timeout and server.poll() is None:
+            try:
+                response = httpx.get(url)
+            except httpx.TransportError:
+                time.sleep(0.01)
+                continue
+            times.setdefault("listening", time.perf_counter() - started)
+            if response.status_code == 200:
+                times["ready"] = time.perf_counter() - started
+                times["phases"] = response.json()["data"]
+                break
+            time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+    return times
+
+
+if __name__ == "__main__":
+    environment = os.environ.copy()
+    if "--fast" in sys.argv[1:]:
+        environment["ACTIVEBOOST_GENERATE_SCHEMAS"] = "false"
+    interpreter, setup, imports = get_import_times(environment)
+    print(f"Interpreter start: {interpreter:.3f}s")
+    print(f"Imports and app setup: {setup:.3f}s")
+    for name, seconds in imports:
+        print(f"    {name}: {seconds:.3f}s")
+    times = get_boot_times(environment, "http://127.0.0.1:8000/ready")
+    if "listening" not in times:
+        sys.exit("Server did not respond.")
+    print(f"Process start until listening: {times["listening"]:.3f}s")
+    if "ready" not in times:
+        sys.exit("Server did not become ready.")
+    for phase, seconds in times["phases"].items():
+        print(f"    {phase}: {seconds:.3f}s")
+    print(f"Process start until ready: {times["ready"]:.3f}s")